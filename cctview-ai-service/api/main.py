@@ -6,9 +6,12 @@ Provides AI inference endpoints for vision, detection, embeddings, and depth ana
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from PIL import Image
+import base64
+import cv2
 import io
 import logging
 import numpy as np
@@ -46,11 +49,13 @@ app.add_middleware(
 # Pydantic models for request/response
 class EmbeddingRequest(BaseModel):
     text: str
+    encoding: Optional[str] = None  # "fp16_b64" packs the vector as base64 float16
 
 
 class BatchEmbeddingRequest(BaseModel):
     texts: List[str]
     batch_size: Optional[int] = 32
+    encoding: Optional[str] = None  # "fp16_b64" packs all vectors as base64 float16
 
 
 class CaptionResponse(BaseModel):
@@ -108,6 +113,7 @@ async def root():
             "detect": "POST /detect",
             "detect_yolo": "POST /detect/yolo",
             "depth": "POST /depth",
+            "stitch": "POST /stitch",
             "embed": "POST /embed",
             "batch_embed": "POST /embed/batch"
         }
@@ -564,6 +570,86 @@ async def estimate_depth(
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+def _stitch_images(images: List[np.ndarray], mode: str):
+    """Run the OpenCV stitcher (called in the threadpool)"""
+    # Prefer OpenCL-backed UMats when the OpenCV build has a GPU device
+    cv2.ocl.setUseOpenCL(True)
+    stitcher = cv2.Stitcher_create(
+        cv2.Stitcher_SCANS if mode == "scans" else cv2.Stitcher_PANORAMA
+    )
+    return stitcher.stitch(images)
+
+
+@app.post("/stitch")
+async def stitch_frames(
+    files: List[UploadFile] = File(...),
+    mode: str = Query(default="panorama", description="Stitch mode: panorama or scans")
+):
+    """
+    Stitch overlapping camera frames into a panorama
+    
+    - **files**: Two or more image files, ordered left to right
+    - **mode**: panorama (rotating camera) or scans (affine, e.g. flat scenes)
+    
+    Returns JSON with the stitched frame as base64 encoded JPEG
+    """
+    try:
+        if len(files) < 2:
+            raise HTTPException(
+                status_code=400,
+                detail="At least two image files are required"
+            )
+        
+        images = []
+        for i, file in enumerate(files):
+            contents = await file.read()
+            image = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File {i} must be an image"
+                )
+            images.append(image)
+        
+        logger.info(f"🎨 Stitching {len(images)} frames in {mode} mode")
+        
+        status, stitched = await run_in_threadpool(_stitch_images, images, mode)
+        
+        # Frames that don't overlap are a result, not a server error
+        if status != cv2.Stitcher_OK:
+            logger.warning(f"⚠️ Stitching failed with status code: {status}")
+            return JSONResponse({
+                "success": False,
+                "error": f"Stitching failed with status code: {status}",
+                "status": int(status)
+            })
+        
+        ok, buf = cv2.imencode(".jpg", stitched, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not ok:
+            raise HTTPException(status_code=500, detail="Failed to encode stitched frame")
+        
+        logger.info(f"✅ Panorama stitched: {stitched.shape[1]}x{stitched.shape[0]}")
+        
+        return JSONResponse({
+            "success": True,
+            "stitched_image_base64": base64.b64encode(buf.tobytes()).decode('utf-8'),
+            "width": stitched.shape[1],
+            "height": stitched.shape[0]
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Stitching error: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _pack_fp16_b64(vectors) -> str:
+    """Base64 of the vectors as little-endian float16 (row-major)"""
+    return base64.b64encode(np.asarray(vectors, dtype='<f2').tobytes()).decode('utf-8')
+
+
 @app.post("/embed")
 async def generate_embedding(request: EmbeddingRequest):
     """
@@ -585,6 +671,9 @@ async def generate_embedding(request: EmbeddingRequest):
         
         if result.get("success"):
             logger.info(f"✅ Generated {result['dimensions']}-dimensional embedding")
+            if request.encoding == "fp16_b64":
+                result["embedding_b64"] = _pack_fp16_b64(result.pop("embedding"))
+                result["encoding"] = "fp16_b64"
             return JSONResponse(result)
         else:
             raise HTTPException(status_code=500, detail=result.get("error"))
@@ -621,6 +710,11 @@ async def batch_generate_embeddings(request: BatchEmbeddingRequest):
         
         if result.get("success"):
             logger.info(f"✅ Generated {result['count']} embeddings")
+            if request.encoding == "fp16_b64" and result["embeddings"]:
+                embeddings = result.pop("embeddings")
+                result["embeddings_b64"] = _pack_fp16_b64(embeddings)
+                result["dimensions"] = len(embeddings[0])
+                result["encoding"] = "fp16_b64"
             return JSONResponse(result)
         else:
             raise HTTPException(status_code=500, detail=result.get("error"))
@@ -100,6 +100,7 @@ async def generate_caption(file: UploadFile = File(...)):
                     "confidence": confidence,
                     "filename": file.filename
                 })
+                await redis_client.bump_event_data_version()
                 
                 logger.info(f"✅ Stored event in Neo4j: {event_id}")
 
@@ -14,6 +14,7 @@ import json
 
 from app.db.neo4j.client import neo4j_client
 from app.db.redis.client import redis_client
+from app.services.anomaly_detection_service import anomaly_detection_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -44,7 +45,7 @@ async def get_all_anomaly_rules(
             RETURN r.id as id, r.name as name, r.description as description,
                    r.rule_type as rule_type, r.severity as severity, r.conditions as conditions,
                    r.enabled as enabled, r.priority as priority, r.created_by as created_by,
-                   r.created_at as created_at
+                   r.created_at as created_at, coalesce(r.always_check, true) as always_check
             ORDER BY r.priority DESC, r.created_at DESC
             """
             params = {"enabled": enabled}
@@ -54,7 +55,7 @@ async def get_all_anomaly_rules(
             RETURN r.id as id, r.name as name, r.description as description,
                    r.rule_type as rule_type, r.severity as severity, r.conditions as conditions,
                    r.enabled as enabled, r.priority as priority, r.created_by as created_by,
-                   r.created_at as created_at
+                   r.created_at as created_at, coalesce(r.always_check, true) as always_check
             ORDER BY r.priority DESC, r.created_at DESC
             """
             params = {}
@@ -107,7 +108,7 @@ async def get_anomaly_rule(rule_id: str):
         RETURN r.id as id, r.name as name, r.description as description,
                r.rule_type as rule_type, r.severity as severity, r.conditions as conditions,
                r.enabled as enabled, r.priority as priority, r.created_by as created_by,
-               r.created_at as created_at, collect(c.id) as camera_ids
+               r.created_at as created_at, coalesce(r.always_check, true) as always_check, collect(c.id) as camera_ids
         """
         
         results = await neo4j_client.async_execute_query(query, {"rule_id": rule_id})
@@ -168,8 +169,14 @@ async def create_anomaly_rule(rule_data: Dict[str, Any]):
         },
         "camera_ids": ["cam_001", "cam_003"],
         "enabled": true,
-        "priority": 8
+        "priority": 8,
+        "always_check": true
     }
+    
+    always_check (default true): when embeddings are unavailable, still send
+    the rule to the LLM if the caption shares no keywords with its
+    description (needed for rules matched on meaning, e.g. "loitering" vs.
+    "man standing by the door"); set false to let the keyword prefilter skip it
     """
     try:
         logger.info(f"📝 Creating anomaly rule: {rule_data.get('name')}")
@@ -187,13 +194,14 @@ async def create_anomaly_rule(rule_data: Dict[str, Any]):
             conditions: $conditions,
             enabled: $enabled,
             priority: $priority,
+            always_check: $always_check,
             created_by: $created_by,
             created_at: datetime()
         })
         RETURN r.id as id, r.name as name, r.description as description,
                r.rule_type as rule_type, r.severity as severity, r.conditions as conditions,
                r.enabled as enabled, r.priority as priority, r.created_by as created_by,
-               r.created_at as created_at
+               r.created_at as created_at, coalesce(r.always_check, true) as always_check
         """
         
         # Serialize conditions to JSON string (Neo4j doesn't support nested maps)
@@ -209,6 +217,7 @@ async def create_anomaly_rule(rule_data: Dict[str, Any]):
             "conditions": conditions_json,  # Store as JSON string
             "enabled": rule_data.get("enabled", True),
             "priority": rule_data.get("priority", 5),
+            "always_check": rule_data.get("always_check", True),
             "created_by": rule_data.get("created_by", "system")
         }
         
@@ -247,6 +256,8 @@ async def create_anomaly_rule(rule_data: Dict[str, Any]):
             if hasattr(created_at, 'isoformat'):
                 created_rule['created_at'] = created_at.isoformat()
         
+        await anomaly_detection_service.invalidate_rules_cache()
+        
         logger.info(f"✅ Created anomaly rule: {rule_id}")
         
         return {
@@ -306,6 +317,10 @@ async def update_anomaly_rule(rule_id: str, rule_data: Dict[str, Any]):
             update_fields.append("r.priority = $priority")
             params["priority"] = rule_data["priority"]
         
+        if "always_check" in rule_data:
+            update_fields.append("r.always_check = $always_check")
+            params["always_check"] = rule_data["always_check"]
+        
         if update_fields:
             query = f"""
             MATCH (r:AnomalyRule {{id: $rule_id}})
@@ -313,7 +328,7 @@ async def update_anomaly_rule(rule_id: str, rule_data: Dict[str, Any]):
             RETURN r.id as id, r.name as name, r.description as description,
                    r.rule_type as rule_type, r.severity as severity, r.conditions as conditions,
                    r.enabled as enabled, r.priority as priority, r.created_by as created_by,
-                   r.created_at as created_at
+                   r.created_at as created_at, coalesce(r.always_check, true) as always_check
             """
             
             result = await neo4j_client.async_execute_query(query, params)
@@ -325,7 +340,7 @@ async def update_anomaly_rule(rule_id: str, rule_data: Dict[str, Any]):
             RETURN r.id as id, r.name as name, r.description as description,
                    r.rule_type as rule_type, r.severity as severity, r.conditions as conditions,
                    r.enabled as enabled, r.priority as priority, r.created_by as created_by,
-                   r.created_at as created_at
+                   r.created_at as created_at, coalesce(r.always_check, true) as always_check
             """
             result = await neo4j_client.async_execute_query(get_query, {"rule_id": rule_id})
             updated_rule = dict(result[0]) if result else {}
@@ -366,6 +381,8 @@ async def update_anomaly_rule(rule_id: str, rule_data: Dict[str, Any]):
                     "camera_ids": rule_data["camera_ids"]
                 })
         
+        await anomaly_detection_service.invalidate_rules_cache()
+        
         logger.info(f"✅ Updated anomaly rule: {rule_id}")
         
         return {
@@ -406,6 +423,8 @@ async def delete_anomaly_rule(rule_id: str):
         """
         await neo4j_client.async_execute_query(delete_query, {"rule_id": rule_id})
         
+        await anomaly_detection_service.invalidate_rules_cache()
+        
         logger.info(f"✅ Deleted anomaly rule: {rule_id}")
         
         return {
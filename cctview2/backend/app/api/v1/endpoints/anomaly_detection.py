@@ -52,7 +52,8 @@ async def check_caption_for_anomalies(
             camera_id,
             caption,
             timestamp,
-            confidence
+            confidence,
+            dedup=False
         )
         
         if anomaly:
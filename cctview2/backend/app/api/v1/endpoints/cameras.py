@@ -14,7 +14,7 @@ import cv2
 import io
 import numpy as np
 from PIL import Image
-import uuid
+import secrets
 import httpx
 from app.core.config import settings
 
@@ -22,6 +22,7 @@ from app.models.camera import CameraCreate, CameraResponse, CameraUpdate
 from app.db.neo4j.client import neo4j_client
 from app.db.redis.client import redis_client
 from app.video.stream_manager import stream_manager
+from app.services.camera_service import camera_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -1192,14 +1193,7 @@ async def proxy_http_stream(camera_id: str):
 async def get_all_cameras():
     """Get all cameras"""
     try:
-        query = """
-        MATCH (c:Camera)
-        RETURN c
-        ORDER BY c.created_at DESC
-        """
-        result = await neo4j_client.async_execute_query(query)
-        cameras = [convert_neo4j_datetime(dict(record['c'])) for record in result]
-        return cameras
+        return await camera_service.get_all_cameras()
     except Exception as e:
         logger.error(f"Error fetching cameras: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1209,11 +1203,10 @@ async def get_all_cameras():
 async def get_camera(camera_id: str):
     """Get single camera"""
     try:
-        query = "MATCH (c:Camera {id: $camera_id}) RETURN c"
-        result = await neo4j_client.async_execute_query(query, {"camera_id": camera_id})
-        if not result:
+        camera = await camera_service.get_camera_by_id(camera_id)
+        if not camera:
             raise HTTPException(status_code=404, detail="Camera not found")
-        return convert_neo4j_datetime(dict(result[0]['c']))
+        return camera
     except HTTPException:
         raise
     except Exception as e:
@@ -1224,7 +1217,7 @@ async def get_camera(camera_id: str):
 async def add_camera(camera: CameraCreate, background_tasks: BackgroundTasks):
     """Add new camera"""
     try:
-        camera_id = f"cam_{uuid.uuid4().hex[:8]}"
+        camera_id = f"cam_{secrets.token_hex(4)}"
         camera_data = {
             "id": camera_id,
             "name": camera.name,
@@ -1240,19 +1233,9 @@ async def add_camera(camera: CameraCreate, background_tasks: BackgroundTasks):
             "created_at": datetime.now().isoformat()
         }
         
-        query = """
-        CREATE (c:Camera {
-            id: $id, name: $name, location: $location,
-            stream_url: $stream_url, stream_type: $stream_type,
-            description: $description, status: $status,
-            resolution: $resolution, fps: $fps,
-            uptime: $uptime, eventsToday: $eventsToday,
-            created_at: datetime($created_at)
-        })
-        RETURN c
-        """
-        result = await neo4j_client.async_execute_query(query, camera_data)
-        created_camera = convert_neo4j_datetime(dict(result[0]['c']))
+        created = await neo4j_client.create_cameras_bulk([camera_data])
+        created_camera = convert_neo4j_datetime(dict(created[0]))
+        await camera_service.invalidate_camera_cache(camera_id)
         
         background_tasks.add_task(
             stream_manager.start_camera_stream,
@@ -1283,6 +1266,7 @@ async def delete_camera(camera_id: str, keep_events: bool = Query(True)):
         
         await neo4j_client.async_execute_query(query, {"camera_id": camera_id})
         await redis_client.clear_camera_cache(camera_id)
+        await camera_service.invalidate_camera_cache(camera_id)
         
         return {"message": "Camera deleted", "camera_id": camera_id}
     except Exception as e:
@@ -1294,33 +1278,12 @@ async def delete_camera(camera_id: str, keep_events: bool = Query(True)):
 async def update_camera(camera_id: str, camera_update: CameraUpdate):
     """Update camera configuration"""
     try:
-        query = "MATCH (c:Camera {id: $camera_id}) RETURN c"
-        result = await neo4j_client.async_execute_query(query, {"camera_id": camera_id})
-        if not result:
+        updated_camera = await camera_service.update_camera(
+            camera_id, camera_update.model_dump(exclude_none=True)
+        )
+        if not updated_camera:
             raise HTTPException(status_code=404, detail="Camera not found")
-        
-        update_fields = []
-        params = {"camera_id": camera_id}
-        
-        if camera_update.name is not None:
-            update_fields.append("c.name = $name")
-            params["name"] = camera_update.name
-        if camera_update.location is not None:
-            update_fields.append("c.location = $location")
-            params["location"] = camera_update.location
-        if camera_update.description is not None:
-            update_fields.append("c.description = $description")
-            params["description"] = camera_update.description
-        if camera_update.status is not None:
-            update_fields.append("c.status = $status")
-            params["status"] = camera_update.status
-        
-        if update_fields:
-            query = f"MATCH (c:Camera {{id: $camera_id}}) SET {', '.join(update_fields)} RETURN c"
-            result = await neo4j_client.async_execute_query(query, params)
-            return convert_neo4j_datetime(dict(result[0]['c']))
-        
-        return convert_neo4j_datetime(dict(result[0]['c']))
+        return updated_camera
     except HTTPException:
         raise
     except Exception as e:
@@ -1341,6 +1304,7 @@ async def start_camera_stream(camera_id: str, background_tasks: BackgroundTasks)
             "MATCH (c:Camera {id: $camera_id}) SET c.status = 'connecting'",
             {"camera_id": camera_id}
         )
+        await camera_service.invalidate_camera_cache(camera_id)
         
         background_tasks.add_task(
             stream_manager.start_camera_stream,
@@ -1364,6 +1328,7 @@ async def stop_camera_stream(camera_id: str):
             "MATCH (c:Camera {id: $camera_id}) SET c.status = 'inactive'",
             {"camera_id": camera_id}
         )
+        await camera_service.invalidate_camera_cache(camera_id)
         return {"message": "Stream stopped", "camera_id": camera_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1409,6 +1374,7 @@ async def update_caption_interval(camera_id: str, interval: int = Query(..., ge=
             "MATCH (c:Camera {id: $camera_id}) SET c.caption_interval = $interval RETURN c",
             {"camera_id": camera_id, "interval": interval}
         )
+        await camera_service.invalidate_camera_cache(camera_id)
         
         return {"message": "Caption interval updated", "camera_id": camera_id, "interval": interval}
     except HTTPException:
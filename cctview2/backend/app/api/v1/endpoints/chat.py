@@ -6,6 +6,7 @@ REST API for RAG chatbot interactions
 """
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 import logging
 
@@ -199,28 +200,15 @@ async def export_conversation(session_id: str):
     """
     Export conversation history in JSON format
     
+    The document is streamed as history pages are read from Neo4j.
+    
     Args:
         session_id: Session identifier to export
     """
-    try:
-        export_data = await chat_service.export_conversation(session_id)
-        
-        if 'error' in export_data:
-            raise HTTPException(
-                status_code=404,
-                detail=export_data['error']
-            )
-        
-        return export_data
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Error exporting conversation: {e}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error exporting conversation: {str(e)}"
-        )
+    return StreamingResponse(
+        chat_service.export_conversation(session_id),
+        media_type="application/json"
+    )
 
 
 @router.post("/test")
@@ -7,6 +7,7 @@ Broadcasts anomaly alerts to connected clients
 from fastapi import WebSocket, WebSocketDisconnect
 from typing import List
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -33,10 +34,12 @@ class AlertsConnectionManager:
 			logger.warning(f"⚠️ No active WebSocket connections to send alert: {data.get('rule_name', 'Unknown')}")
 			return
 		logger.info(f"📤 Broadcasting alert to {len(self.active_connections)} client(s): {data.get('rule_name', 'Unknown')}")
+		# Serialize once for all clients (send_json would re-encode per connection)
+		message = orjson.dumps(data, option=orjson.OPT_NAIVE_UTC).decode()
 		disconnected = []
 		for connection in self.active_connections:
 			try:
-				await connection.send_json(data)
+				await connection.send_text(message)
 				logger.debug(f"✅ Alert sent to WebSocket client: {data.get('rule_name', 'Unknown')}")
 			except Exception as e:
 				logger.error(f"❌ Error sending alert to WebSocket: {e}", exc_info=True)
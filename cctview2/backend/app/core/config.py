@@ -44,6 +44,7 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: Optional[str] = None
     REDIS_DB: int = 0
     REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: int = 10  # seconds to wait for a free pooled connection
     
     #LLM Configuration
     LLM_PROVIDER: str ="ollama"
@@ -51,6 +52,7 @@ class Settings(BaseSettings):
     # Ollama Settings
     OLLAMA_BASE_URL: str = "http://192.168.0.9:11434"
     OLLAMA_MODEL: str = "llama3.1:8b"
+    OLLAMA_EMBEDDING_MODEL: str = "nomic-embed-text"
     OLLAMA_TIMEOUT: int = 300
 
     # OpenAI Settings (optional)
@@ -68,6 +70,7 @@ class Settings(BaseSettings):
     NEO4J_DATABASE: str = "neo4j"
     NEO4J_MAX_CONNECTION_LIFETIME: int = 3600
     NEO4J_MAX_CONNECTION_POOL_SIZE: int = 50
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: int = 30  # seconds to wait for a free pooled connection
     
     # Retention Policies
     RETENTION_30_DAYS: int = 30
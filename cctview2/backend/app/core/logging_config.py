@@ -3,11 +3,34 @@ Logging Configuration
 Structured JSON logging for production
 """
 
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from datetime import datetime
 import json
+from typing import Optional
+
+
+# Background listener that drains queued records to the real handlers
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _UnformattedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener's handlers"""
+    
+    def prepare(self, record):
+        # The stock prepare() formats the record here, on the caller's thread,
+        # and drops exc_info. Only the message arguments are merged (so later
+        # mutation of them can't change the log line); exc_info is kept for
+        # the listener, which is fine for the in-process queue.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
 class JSONFormatter(logging.Formatter):
@@ -39,10 +62,16 @@ def setup_logging(log_level: str = "INFO", log_format: str = "json"):
     """
     Setup application logging
     
+    Records are handed to a QueueHandler and written out by a background
+    QueueListener, so formatting and stdout/file I/O stay off the event loop.
+    
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_format: Format type ("json" or "text")
     """
+    global _queue_listener
+    
+    stop_logging()
     
     # Create logs directory
     logs_dir = Path("./logs")
@@ -76,13 +105,32 @@ def setup_logging(log_level: str = "INFO", log_format: str = "json"):
     console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
     
-    # Add handlers
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    # Add handlers (via queue)
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(_UnformattedQueueHandler(log_queue))
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue,
+        console_handler,
+        file_handler,
+        respect_handler_level=True
+    )
+    _queue_listener.start()
     
     # Suppress noisy loggers
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("asyncio").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
     
-    logging.info("Logging configured successfully")
\ No newline at end of file
+    logging.info("Logging configured successfully")
+
+
+def stop_logging():
+    """Flush queued log records and stop the background listener"""
+    global _queue_listener
+    
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(stop_logging)
@@ -4,6 +4,7 @@ Manages Neo4j graph database connections
 """
 
 from neo4j import GraphDatabase, AsyncGraphDatabase
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 
@@ -18,6 +19,8 @@ class Neo4jClient:
     def __init__(self):
         self.driver = None
         self.async_driver = None
+        # One async driver (and pool) per process, even if the first queries race
+        self._async_connect_lock = asyncio.Lock()
         logger.info("🟢 Neo4j Client initialized")
     
     def connect(self):
@@ -27,7 +30,8 @@ class Neo4jClient:
                 settings.NEO4J_URI,
                 auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
                 max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
-                max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE
+                max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+                connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT
             )
             self.driver.verify_connectivity()
             logger.info("✅ Neo4j connected successfully")
@@ -36,13 +40,21 @@ class Neo4jClient:
             raise
     
     async def async_connect(self):
-        """Create asynchronous connection"""
+        """Create asynchronous connection (no-op if already connected)"""
+        async with self._async_connect_lock:
+            if self.async_driver:
+                return
+            await self._create_async_driver()
+    
+    async def _create_async_driver(self):
+        """Create the async driver and its connection pool"""
         try:
             self.async_driver = AsyncGraphDatabase.driver(
                 settings.NEO4J_URI,
                 auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
                 max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
-                max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE
+                max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+                connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT
             )
             await self.async_driver.verify_connectivity()
             logger.info("✅ Neo4j async connected successfully")
@@ -60,6 +72,7 @@ class Neo4jClient:
         """Close async connection"""
         if self.async_driver:
             await self.async_driver.close()
+            self.async_driver = None
         logger.info("Neo4j async connection closed")
     
     def verify_connectivity(self):
@@ -115,6 +128,26 @@ class Neo4jClient:
             logger.error(f"Async query execution failed: {e}")
             raise
     
+    async def async_execute_write(
+        self,
+        query: str,
+        parameters: Dict[str, Any] = None
+    ) -> List[Dict]:
+        """Execute Cypher query in a managed write transaction (retried on transient errors)"""
+        try:
+            if not self.async_driver:
+                await self.async_connect()
+            
+            async def work(tx):
+                result = await tx.run(query, parameters or {})
+                return await result.data()
+            
+            async with self.async_driver.session(database=settings.NEO4J_DATABASE) as session:
+                return await session.execute_write(work)
+        except Exception as e:
+            logger.error(f"Async write transaction failed: {e}")
+            raise
+    
     # Schema Initialization
     def initialize_schema(self):
         """Create constraints and indexes"""
@@ -135,6 +168,12 @@ class Neo4jClient:
             "CREATE INDEX anomaly_detected IF NOT EXISTS FOR (a:Anomaly) ON (a.detected_at)",
             "CREATE INDEX person_last_seen IF NOT EXISTS FOR (p:TrackedPerson) ON (p.last_seen)",
             "CREATE INDEX camera_status IF NOT EXISTS FOR (c:Camera) ON (c.status)",
+            "CREATE INDEX camera_is_active IF NOT EXISTS FOR (c:Camera) ON (c.is_active)",
+            "CREATE INDEX camera_created IF NOT EXISTS FOR (c:Camera) ON (c.created_at)",
+            "CREATE INDEX anomaly_status IF NOT EXISTS FOR (a:Anomaly) ON (a.status)",
+            "CREATE INDEX person_first_seen IF NOT EXISTS FOR (p:TrackedPerson) ON (p.first_seen)",
+            "CREATE INDEX querylog_session_time IF NOT EXISTS FOR (q:QueryLog) ON (q.session_id, q.timestamp)",
+            "CREATE INDEX querylog_time IF NOT EXISTS FOR (q:QueryLog) ON (q.timestamp)",
         ]
         
         for statement in constraints_and_indexes:
@@ -165,6 +204,28 @@ class Neo4jClient:
         result = await self.async_execute_query(query, camera_data)
         return result[0] if result else None
     
+    async def create_cameras_bulk(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create camera nodes from property maps in one query
+        
+        Args:
+            items: Camera properties; created_at (ISO string) is stored as a
+                datetime, defaulting to now
+        
+        Returns:
+            Created camera nodes, in input order
+        """
+        query = """
+        UNWIND $items AS i
+        CREATE (c:Camera)
+        SET c = i,
+            c.created_at = CASE WHEN i.created_at IS NULL THEN datetime() ELSE datetime(i.created_at) END
+        RETURN c
+        """
+        
+        result = await self.async_execute_write(query, {"items": items})
+        return [record["c"] for record in result]
+    
     async def get_camera(self, camera_id: str) -> Optional[Dict[str, Any]]:
         """Get camera by ID"""
         query = "MATCH (c:Camera {id: $camera_id}) RETURN c"
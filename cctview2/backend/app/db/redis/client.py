@@ -15,6 +15,11 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Counter shared by every process, bumped whenever event data changes (captions
+# stored or removed, events written to Neo4j) so readers such as the RAG context
+# cache can tell when their view is stale
+EVENT_DATA_VERSION_KEY = "events:data_version"
+
 
 class RedisClient:
     """Async Redis client wrapper - Hot cache only (2 hours max)"""
@@ -27,12 +32,16 @@ class RedisClient:
     async def connect(self):
         """Create connection pool"""
         try:
-            self.pool = aioredis.ConnectionPool(
+            # Blocking pool: under a burst of concurrent camera work callers
+            # wait for a free connection instead of failing with
+            # "Too many connections" once the pool is exhausted
+            self.pool = aioredis.BlockingConnectionPool(
                 host=settings.REDIS_HOST,
                 port=settings.REDIS_PORT,
                 password=settings.REDIS_PASSWORD,
                 db=settings.REDIS_DB,
                 max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
                 decode_responses=False  # Handle binary data
             )
             self.client = aioredis.Redis(connection_pool=self.pool)
@@ -102,18 +111,35 @@ class RedisClient:
                 "metadata": metadata or {}
             }
             
+            pipe = self.client.pipeline(transaction=True)
+            
             # Store caption (text)
             caption_key = f"caption:{camera_id}:{timestamp_key}"
-            await self.client.setex(caption_key, ttl, caption)
+            pipe.setex(caption_key, ttl, caption)
             
             # Store embedding (binary)
             embedding_key = f"embedding:{camera_id}:{timestamp_key}"
             embedding_array = np.array(embedding, dtype=np.float32)
-            await self.client.setex(embedding_key, ttl, embedding_array.tobytes())
+            pipe.setex(embedding_key, ttl, embedding_array.tobytes())
             
             # Store full event metadata (JSON)
             metadata_key = f"meta:{camera_id}:{timestamp_key}"
-            await self.client.setex(metadata_key, ttl, json.dumps(event_data))
+            event_json = json.dumps(event_data)
+            pipe.setex(metadata_key, ttl, event_json)
+            
+            # Index caption timestamps per camera (latest caption without a keyspace scan),
+            # dropping entries older than the caption TTL
+            index_key = f"captions:{camera_id}"
+            score = timestamp.timestamp()
+            pipe.zadd(index_key, {timestamp_key: score})
+            pipe.zremrangebyscore(index_key, "-inf", score - ttl)
+            pipe.expire(index_key, ttl)
+            
+            # Push the new caption to subscribers (e.g. anomaly detection)
+            pipe.publish(f"caption_events:{camera_id}", event_json)
+            pipe.incr(EVENT_DATA_VERSION_KEY)
+            
+            await pipe.execute()
             
             logger.debug(f"✅ Stored caption with metadata: {camera_id} at {timestamp_key}")
             return True
@@ -162,6 +188,26 @@ class RedisClient:
             logger.error(f"❌ Failed to get caption metadata: {e}")
             return None
     
+    async def get_latest_caption_timestamp(self, camera_id: str) -> Optional[str]:
+        """
+        Timestamp key of the camera's most recent cached caption
+        
+        Returns:
+            ISO timestamp string, or None if nothing is cached
+        """
+        try:
+            if not self.client:
+                await self.connect()
+            
+            latest = await self.client.zrevrange(f"captions:{camera_id}", 0, 0)
+            if not latest:
+                return None
+            return latest[0].decode() if isinstance(latest[0], bytes) else latest[0]
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get latest caption timestamp: {e}")
+            return None
+    
     # ==================== MIGRATION DETECTION ====================
     
     async def get_keys_near_expiry(
@@ -312,6 +358,35 @@ class RedisClient:
             logger.error(f"❌ Failed to get captions in range: {e}")
             return []
     
+    # ==================== EVENT DATA VERSION ====================
+    
+    async def bump_event_data_version(self):
+        """Mark event data as changed for every process"""
+        try:
+            if not self.client:
+                await self.connect()
+            
+            await self.client.incr(EVENT_DATA_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to bump event data version: {e}")
+    
+    async def get_event_data_version(self) -> Optional[int]:
+        """
+        Current event data version
+        
+        Returns:
+            Version number (0 before any write), or None if Redis is unavailable
+        """
+        try:
+            if not self.client:
+                await self.connect()
+            
+            value = await self.client.get(EVENT_DATA_VERSION_KEY)
+            return int(value) if value else 0
+        except Exception as e:
+            logger.debug(f"Failed to read event data version: {e}")
+            return None
+    
     # ==================== LEGACY METHODS (Simplified) ====================
     
     async def store_caption(
@@ -369,6 +444,7 @@ class RedisClient:
             
             # Delete all related keys (caption, embedding, metadata)
             all_keys = []
+            index_entries: Dict[str, List[str]] = {}
             for key in keys:
                 # Get base key parts
                 parts = key.split(':')
@@ -382,8 +458,12 @@ class RedisClient:
                         f"embedding:{camera_id}:{timestamp}",
                         f"meta:{camera_id}:{timestamp}"
                     ])
+                    index_entries.setdefault(camera_id, []).append(timestamp)
             
             deleted = await self.client.delete(*all_keys) if all_keys else 0
+            for camera_id, timestamps in index_entries.items():
+                await self.client.zrem(f"captions:{camera_id}", *timestamps)
+            await self.bump_event_data_version()
             logger.info(f"🗑️  Deleted {deleted} keys after migration")
             return deleted
             
@@ -441,6 +521,9 @@ class RedisClient:
                     if cursor == 0:
                         break
             
+            deleted += await self.client.delete(f"captions:{camera_id}")
+            
+            await self.bump_event_data_version()
             logger.info(f"🗑️  Cleared {deleted} keys for camera {camera_id}")
             return deleted
             
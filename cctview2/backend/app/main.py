@@ -10,7 +10,7 @@ import logging
 import asyncio
 
 from app.core.config import settings
-from app.core.logging_config import setup_logging
+from app.core.logging_config import setup_logging, stop_logging
 from app.api.v1.router import api_router
 from app.db.redis.client import redis_client
 from app.db.neo4j.client import neo4j_client
@@ -36,10 +36,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {e}")
     
-    # Initialize Neo4j connection
+    # Initialize Neo4j connection (the async driver's pool serves all request paths)
     try:
         neo4j_client.verify_connectivity()
+        await neo4j_client.async_connect()
         logger.info("✅ Neo4j connected")
+        # Constraints and indexes (all IF NOT EXISTS, so cheap on later starts)
+        neo4j_client.initialize_schema()
     except Exception as e:
         logger.error(f"❌ Neo4j connection failed: {e}")
     
@@ -60,6 +63,17 @@ async def lifespan(app: FastAPI):
     cleanup_task = asyncio.create_task(cleanup_orphaned_hls_files())
     logger.info("✅ HLS cleanup task started")
     
+    # Check new captions for anomalies as they are stored
+    from app.services.anomaly_detection_service import anomaly_detection_service
+    anomaly_task = asyncio.create_task(anomaly_detection_service.run_caption_listener())
+    # Load models and open connections now rather than on the first caption
+    warmup_task = asyncio.create_task(anomaly_detection_service.warmup())
+    
+    # Write buffered per-camera event counts and statuses to Neo4j
+    from app.services.camera_service import camera_service
+    event_count_task = asyncio.create_task(camera_service.run_event_count_flusher())
+    status_task = asyncio.create_task(camera_service.run_status_flusher())
+    
     logger.info("=" * 60)
     
     yield
@@ -74,6 +88,25 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         logger.info("✅ HLS cleanup task stopped")
     
+    warmup_task.cancel()
+    anomaly_task.cancel()
+    try:
+        await anomaly_task
+    except asyncio.CancelledError:
+        logger.info("✅ Anomaly caption listener stopped")
+    
+    event_count_task.cancel()
+    try:
+        await event_count_task
+    except asyncio.CancelledError:
+        logger.info("✅ Event count flusher stopped")
+    
+    status_task.cancel()
+    try:
+        await status_task
+    except asyncio.CancelledError:
+        logger.info("✅ Camera status flusher stopped")
+    
     # Stop all active HLS streams
     from app.api.v1.endpoints.cameras import active_hls_processes, stop_hls_transcoding
     camera_ids = list(active_hls_processes.keys())
@@ -84,8 +117,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Error stopping HLS for {camera_id}: {e}")
     
+    from app.services.ai_service_client import ai_service
+    await ai_service.close()
+    
     await redis_client.close()
     neo4j_client.close()
+    await neo4j_client.async_close()
+    stop_logging()
 
 
 # Initialize FastAPI app
@@ -5,6 +5,7 @@ LLM Integration for RAG Chatbot
 Supports both Ollama (local) and OpenAI (cloud) integration
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 import json
@@ -134,8 +135,10 @@ class LLMIntegration:
             
             logger.debug(f"📤 Sending request to Ollama with {len(messages)} messages")
             
-            # Call Ollama API (synchronous, but fast locally)
-            response = ollama.chat(
+            # The ollama module client is synchronous; run it in a worker thread
+            # so the event loop keeps serving streams and websockets meanwhile
+            response = await asyncio.to_thread(
+                ollama.chat,
                 model=self.model,
                 messages=messages,
                 format='json',  # Request JSON output
@@ -5,18 +5,37 @@ Response Generator for RAG Chatbot
 Orchestrates the entire RAG pipeline: Query → Context → LLM → Response
 """
 
+import itertools
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-import uuid
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+from datetime import datetime, timedelta
 
 from app.rag.query_processor import QueryProcessor
 from app.rag.context_builder import ContextBuilder
 from app.rag.llm_integration import LLMIntegration
 from app.db.neo4j.client import neo4j_client
+from app.db.redis.client import redis_client
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Per-session retrieval cache bounds
+SESSION_CACHE_MAX_ENTRIES = 32
+SESSION_CACHE_MAX_SESSIONS = 256
+SESSION_CACHE_TTL = 30  # seconds
+
+# Query IDs: per-process random prefix + counter (no urandom call per request)
+_process_nonce = secrets.token_hex(4)
+_query_counter = itertools.count()
+
+# Source timestamp formats rendered in one strftime call and split:
+# full timestamp | long date | 12h time
+_SOURCE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S|%B %d, %Y|%I:%M %p'
+_SOURCE_RANGE_FORMAT = '%Y-%m-%d %I:%M %p'
+
 
 class ResponseGenerator:
     """Main orchestrator for RAG pipeline"""
@@ -26,6 +45,14 @@ class ResponseGenerator:
         self.context_builder = ContextBuilder()
         self.llm = LLMIntegration()
         
+        # session_id -> (normalized query, time window) -> (context, event data version, expires_at)
+        self._session_cache: "OrderedDict[str, OrderedDict[str, Tuple[Dict, int, float]]]" = OrderedDict()
+        
+        # Intent-specialized pipelines (steps 2-4); anything else takes the default path
+        self._intent_pipelines: Dict[str, Callable[..., Awaitable[Tuple[Dict, Dict, List[str]]]]] = {
+            'statistics': self._statistics_pipeline,
+        }
+        
         logger.info("✅ Response Generator initialized")
     
     async def generate_response(
@@ -48,40 +75,43 @@ class ResponseGenerator:
             Complete response with answer, sources, and metadata
         """
         start_time = datetime.now()
-        query_id = f"query_{uuid.uuid4().hex[:12]}"
+        query_id = f"query_{_process_nonce}{next(_query_counter):08x}"
         
-        logger.info(f"🚀 Processing query [{query_id}]: {user_query[:100]}...")
+        logger.info("🚀 Processing query [%s]: %.100s...", query_id, user_query)
         
         try:
-            # Step 1: Process query
-            logger.info(f"[{query_id}] Step 1/4: Processing query...")
+            # Step 1: Process query (always, so relative windows like "past
+            # hour" are resolved against the current time)
+            logger.info("[%s] Step 1/4: Processing query...", query_id)
             processed_query = self.query_processor.process_query(user_query)
             
-            # Step 2: Build context from Neo4j
-            logger.info(f"[{query_id}] Step 2/4: Building context from Neo4j...")
-            context = await self.context_builder.build_context(
-                processed_query,
-                max_events=15
-            )
+            data_version = await redis_client.get_event_data_version() if session_id else None
+            context = self._get_cached_context(session_id, user_query, processed_query, data_version)
+            cached = context is not None
+            if cached:
+                logger.info("[%s] Reusing cached query context", query_id)
             
-            # Step 3: Generate LLM response
-            logger.info(f"[{query_id}] Step 3/4: Generating LLM response...")
-            llm_response = await self.llm.generate_response(
+            # Steps 2-4: Context, answer and follow-ups, specialized by intent
+            pipeline = self._intent_pipelines.get(
+                processed_query.get('intent'),
+                self._default_pipeline
+            )
+            context, llm_response, suggestions = await pipeline(
+                query_id,
                 user_query,
+                processed_query,
                 context,
                 conversation_history
             )
             
-            # Step 4: Generate follow-up suggestions
-            logger.info(f"[{query_id}] Step 4/4: Generating follow-up suggestions...")
-            suggestions = await self.llm.generate_follow_up_suggestions(
-                user_query,
-                context
-            )
+            if not cached:
+                self._store_cached_context(session_id, user_query, processed_query, context, data_version)
             
             # Calculate processing time
             processing_time = (datetime.now() - start_time).total_seconds()
             
+            sources, event_ids = self._format_sources(context.get('events', []))
+            
             # Build complete response
             response = {
                 'query_id': query_id,
@@ -89,7 +119,7 @@ class ResponseGenerator:
                 'answer': llm_response.get('answer', ''),
                 'summary': llm_response.get('summary', ''),
                 'key_events': llm_response.get('key_events', []),
-                'sources': self._format_sources(context.get('events', [])),
+                'sources': sources,
                 'event_count': context.get('event_count', 0),
                 'cameras': context.get('cameras', []),
                 'time_range': context.get('time_range'),
@@ -111,16 +141,15 @@ class ResponseGenerator:
                     user_id,
                     user_query,
                     response,
+                    event_ids,
                     session_id
                 )
             
-            logger.info(f"✅ [{query_id}] Response generated in {processing_time:.2f}s")
+            logger.info("✅ [%s] Response generated in %.2fs", query_id, processing_time)
             return response
             
         except Exception as e:
-            logger.error(f"❌ [{query_id}] Error generating response: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ [%s] Error generating response", query_id)
             
             return {
                 'query_id': query_id,
@@ -143,9 +172,219 @@ class ResponseGenerator:
                 'success': False
             }
     
-    def _format_sources(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Format event sources for frontend display"""
+    async def _default_pipeline(
+        self,
+        query_id: str,
+        user_query: str,
+        processed_query: Dict[str, Any],
+        context: Optional[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+        """Generic pipeline: full context build followed by an LLM answer"""
+        # Step 2: Build context from Neo4j
+        if context is None:
+            logger.info("[%s] Step 2/4: Building context from Neo4j...", query_id)
+            context = await self.context_builder.build_context(
+                processed_query,
+                max_events=15
+            )
+        
+        # Step 3: Generate LLM response
+        logger.info("[%s] Step 3/4: Generating LLM response...", query_id)
+        llm_response = await self.llm.generate_response(
+            user_query,
+            context,
+            conversation_history
+        )
+        
+        # Step 4: Generate follow-up suggestions
+        logger.info("[%s] Step 4/4: Generating follow-up suggestions...", query_id)
+        suggestions = await self.llm.generate_follow_up_suggestions(
+            user_query,
+            context
+        )
+        
+        return context, llm_response, suggestions
+    
+    async def _statistics_pipeline(
+        self,
+        query_id: str,
+        user_query: str,
+        processed_query: Dict[str, Any],
+        context: Optional[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+        """
+        Count-style queries: answer from a single aggregation, without the LLM
+        
+        Only used when the requested window lies entirely outside the Redis hot
+        cache, since the aggregation only sees events already in Neo4j.
+        """
+        temporal = processed_query.get('temporal')
+        if not temporal or not temporal.get('start_time') or not temporal.get('end_time'):
+            return await self._default_pipeline(
+                query_id, user_query, processed_query, context, conversation_history
+            )
+        
+        hot_cache_start = datetime.now() - timedelta(seconds=settings.REDIS_TTL_2HOUR)
+        if datetime.fromisoformat(temporal['end_time']) >= hot_cache_start:
+            return await self._default_pipeline(
+                query_id, user_query, processed_query, context, conversation_history
+            )
+        
+        # Step 2: Aggregate in Neo4j
+        if context is None or 'statistics' not in context:
+            logger.info("[%s] Step 2/4: Aggregating event statistics...", query_id)
+            stats = await self.context_builder.get_event_statistics(processed_query)
+            if not stats:
+                return await self._default_pipeline(
+                    query_id, user_query, processed_query, None, conversation_history
+                )
+            context = {
+                'events': [],
+                'context_text': '',
+                'event_count': stats.get('total_events', 0),
+                'time_range': temporal,
+                'cameras': [],
+                'statistics': stats,
+                'source': 'neo4j:aggregate'
+            }
+        
+        # Step 3: Templated answer
+        logger.info("[%s] Step 3/4: Building templated answer (LLM skipped)...", query_id)
+        llm_response = self._build_statistics_answer(context)
+        
+        # Step 4: Generate follow-up suggestions
+        logger.info("[%s] Step 4/4: Generating follow-up suggestions...", query_id)
+        suggestions = await self.llm.generate_follow_up_suggestions(
+            user_query,
+            context
+        )
+        
+        return context, llm_response, suggestions
+    
+    def _build_statistics_answer(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Render an aggregation result in the same shape as an LLM response"""
+        stats = context['statistics']
+        temporal = context.get('time_range') or {}
+        
+        if temporal.get('date') and not temporal.get('time_of_day'):
+            period = f"on {temporal['date']}"
+        else:
+            period = f"between {temporal['start_time']} and {temporal['end_time']}"
+        
+        total = stats.get('total_events', 0)
+        if total:
+            answer = (
+                f"{total} events were recorded {period} "
+                f"across {stats.get('cameras_involved', 0)} camera(s)."
+            )
+        else:
+            answer = f"No events were recorded {period}."
+        
+        return {
+            'success': True,
+            'answer': answer,
+            'summary': answer,
+            'key_events': [],
+            'tokens_used': 0,
+            'model': 'template'
+        }
+    
+    @staticmethod
+    def _context_cache_key(user_query: str, processed_query: Dict[str, Any]) -> str:
+        """Cache key: normalized query plus the time window it resolved to"""
+        temporal = processed_query.get('temporal') or {}
+        return '|'.join((
+            ' '.join(user_query.lower().split()),
+            str(temporal.get('start_time')),
+            str(temporal.get('end_time'))
+        ))
+    
+    def _get_cached_context(
+        self,
+        session_id: Optional[str],
+        user_query: str,
+        processed_query: Dict[str, Any],
+        data_version: Optional[int]
+    ) -> Optional[Dict[str, Any]]:
+        """Return the context cached for this session if still current"""
+        if not session_id or data_version is None:
+            return None
+        
+        entries = self._session_cache.get(session_id)
+        if not entries:
+            return None
+        
+        key = self._context_cache_key(user_query, processed_query)
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        
+        context, version, expires_at = entry
+        if version != data_version or expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        
+        entries.move_to_end(key)
+        self._session_cache.move_to_end(session_id)
+        return context
+    
+    def _store_cached_context(
+        self,
+        session_id: Optional[str],
+        user_query: str,
+        processed_query: Dict[str, Any],
+        context: Dict[str, Any],
+        data_version: Optional[int]
+    ):
+        """Remember the query context for this session (LRU bounded)"""
+        if not session_id or data_version is None:
+            return
+        
+        entries = self._session_cache.get(session_id)
+        if entries is None:
+            entries = self._session_cache[session_id] = OrderedDict()
+            if len(self._session_cache) > SESSION_CACHE_MAX_SESSIONS:
+                self._session_cache.popitem(last=False)
+        else:
+            self._session_cache.move_to_end(session_id)
+        
+        entries[self._context_cache_key(user_query, processed_query)] = (
+            context,
+            data_version,
+            time.monotonic() + SESSION_CACHE_TTL
+        )
+        if len(entries) > SESSION_CACHE_MAX_ENTRIES:
+            entries.popitem(last=False)
+    
+    @staticmethod
+    def _to_datetime(value: Any) -> Optional[datetime]:
+        """Coerce a Neo4j timestamp (ISO string, datetime or neo4j DateTime) to datetime"""
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+        if isinstance(value, datetime):
+            return value
+        if hasattr(value, 'to_native'):
+            return value.to_native()
+        return None
+    
+    def _format_sources(
+        self,
+        events: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Format event sources for frontend display
+        
+        Returns:
+            (formatted sources, non-empty event IDs in the same order)
+        """
         formatted_sources = []
+        event_ids = []
+        append = formatted_sources.append
+        to_datetime = self._to_datetime
         
         for event in events:
             # Try to get start_time first (new format), fallback to timestamp (old format)
@@ -154,48 +393,38 @@ class ResponseGenerator:
             duration = event.get('duration', 0)
             frame_count = event.get('frame_count', 1)
             
-            if timestamp:
-                try:
-                    if isinstance(timestamp, str):
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    else:
-                        dt = timestamp
-                    time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    date_str = dt.strftime('%B %d, %Y')
-                    time_only = dt.strftime('%I:%M %p')
-                    
-                    # Format time range if end_time exists (NEW)
-                    if end_time:
-                        try:
-                            if isinstance(end_time, str):
-                                dt_end = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                            else:
-                                dt_end = end_time
-                            
-                            # If same day, show time range: "2:00 PM - 2:05 PM"
-                            if dt.date() == dt_end.date():
-                                time_range = f"{dt.strftime('%I:%M %p')} - {dt_end.strftime('%I:%M %p')}"
-                            else:
-                                # Different days: show full range
-                                time_range = f"{dt.strftime('%Y-%m-%d %I:%M %p')} - {dt_end.strftime('%Y-%m-%d %I:%M %p')}"
-                        except Exception:
-                            time_range = time_only
-                    else:
-                        time_range = time_only
-                        
-                except Exception:
-                    time_str = str(timestamp)
-                    date_str = 'Unknown date'
-                    time_only = 'Unknown time'
-                    time_range = 'Unknown time'
+            dt = to_datetime(timestamp) if timestamp else None
+            
+            if dt is not None:
+                time_str, date_str, time_only = dt.strftime(_SOURCE_TIME_FORMAT).split('|')
+                
+                # Format time range if end_time exists (NEW)
+                dt_end = to_datetime(end_time) if end_time else None
+                if dt_end is None:
+                    time_range = time_only
+                elif dt.date() == dt_end.date():
+                    # If same day, show time range: "2:00 PM - 2:05 PM"
+                    time_range = f"{time_only} - {dt_end.strftime('%I:%M %p')}"
+                else:
+                    # Different days: show full range
+                    time_range = f"{dt.strftime(_SOURCE_RANGE_FORMAT)} - {dt_end.strftime(_SOURCE_RANGE_FORMAT)}"
+            elif timestamp:
+                time_str = str(timestamp)
+                date_str = 'Unknown date'
+                time_only = 'Unknown time'
+                time_range = 'Unknown time'
             else:
                 time_str = 'Unknown time'
                 date_str = 'Unknown date'
                 time_only = 'Unknown time'
                 time_range = 'Unknown time'
             
-            formatted_sources.append({
-                'event_id': event.get('event_id'),
+            event_id = event.get('event_id')
+            if event_id:
+                event_ids.append(event_id)
+            
+            append({
+                'event_id': event_id,
                 'timestamp': time_str,
                 'date': date_str,
                 'time': time_only,
@@ -212,7 +441,7 @@ class ResponseGenerator:
                 'video_reference': event.get('video_reference')
             })
         
-        return formatted_sources
+        return formatted_sources, event_ids
     
     async def _log_query(
         self,
@@ -220,6 +449,7 @@ class ResponseGenerator:
         user_id: str,
         query_text: str,
         response: Dict[str, Any],
+        event_ids: List[str],
         session_id: Optional[str] = None
     ):
         """Log query to Neo4j for analytics"""
@@ -229,6 +459,7 @@ class ResponseGenerator:
             CREATE (q:QueryLog {
                 id: $query_id,
                 query_text: $query_text,
+                query_text_lower: toLower($query_text),
                 intent: $intent,
                 event_count: $event_count,
                 response_time_ms: $response_time_ms,
@@ -240,7 +471,7 @@ class ResponseGenerator:
             """
             
             # Link to events if available
-            if response.get('sources'):
+            if event_ids:
                 query += """
                 WITH q
                 UNWIND $event_ids as event_id
@@ -260,11 +491,11 @@ class ResponseGenerator:
                 'success': response.get('success', False),
                 'timestamp': datetime.now().isoformat(),
                 'session_id': session_id or query_id,
-                'event_ids': [s['event_id'] for s in response.get('sources', []) if s.get('event_id')]
+                'event_ids': event_ids
             }
             
             await neo4j_client.async_execute_query(query, params)
-            logger.debug(f"📝 Logged query {query_id} to Neo4j")
+            logger.debug("📝 Logged query %s to Neo4j", query_id)
             
         except Exception as e:
             logger.error(f"❌ Error logging query: {e}")
@@ -276,12 +507,12 @@ class ResponseGenerator:
     ) -> List[Dict[str, str]]:
         """Retrieve conversation history from Neo4j"""
         try:
+            # Fetch the newest turns first so the (session_id, timestamp)
+            # index can stop after $limit rows, then restore chronological order
             query = """
             MATCH (q:QueryLog {session_id: $session_id})
-            RETURN 
-                q.query_text as query,
-                q.timestamp as timestamp
-            ORDER BY q.timestamp ASC
+            RETURN q.query_text as query
+            ORDER BY q.timestamp DESC
             LIMIT $limit
             """
             
@@ -296,6 +527,7 @@ class ResponseGenerator:
                     'role': 'user',
                     'content': record.get('query', '')
                 })
+            history.reverse()
             
             return history
             
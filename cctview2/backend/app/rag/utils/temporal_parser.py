@@ -8,16 +8,114 @@ IMPROVED: Better handling of recent queries for Redis cache
 
 import re
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, NamedTuple, Optional, Tuple
 import logging
 
+try:
+    import hyperscan
+except ImportError:  # Optional: DFA prefilter for the fused scan
+    hyperscan = None
+
 logger = logging.getLogger(__name__)
 
+# Month name / abbreviation → month number
+_MONTHS: Dict[str, int] = {
+    'january': 1, 'jan': 1,
+    'february': 2, 'feb': 2,
+    'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'may': 5,
+    'june': 6, 'jun': 6,
+    'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8,
+    'september': 9, 'sep': 9,
+    'october': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+}
+
+
+# Possessive quantifier suffix (the '+' in '\s++', '\d{1,2}+', '?+')
+_POSSESSIVE = re.compile(r'(?<!\\)([*+?}])\+')
+
+
+def _iso_date(year: int, month: int, day: int) -> str:
+    """Date part of datetime.isoformat(), without building a datetime"""
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _trie_regex(words) -> str:
+    """Prefix-factored alternation for a set of literal keywords"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}  # end of word
+    
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in node.items() if char]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+    
+    return emit(trie)
+
+
+class TemporalInfo(NamedTuple):
+    """Temporal information extracted from a query"""
+    type: str
+    date: Optional[str]
+    time_of_day: str
+    start_time: str
+    end_time: str
+    description: str
+    redis_eligible: bool
+    redis_priority: Optional[bool] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON callers; fields a parser doesn't set are left out"""
+        return {field: value for field, value in zip(self._fields, self) if value is not None}
+
 
 class TemporalParser:
     """Parse temporal expressions from natural language"""
     
+    __slots__ = (
+        '_day_cache', '_relative_cache', 'relative_patterns',
+        'duration_pattern',
+        'time_pattern', 'time_range_pattern', 'date_pattern', 'named_date_pattern',
+        'recent_pattern', 'what_happened_pattern', 'time_ago_pattern',
+        '_relative_rank', '_scan_order', '_combined', '_hs_db',
+        '_scan_patterns', '_dispatch',
+    )
+    
+    # Day step used by the day-relative parsers; their fixed hours are
+    # formatted straight onto the cached date string
+    ONE_DAY = timedelta(days=1)
+    
+    # Scan groups and relative keywords that mean the query names its own
+    # time, so a bare "what happened" should not default to today
+    SPECIFIC_TIME_GROUPS = frozenset({'time', 'time_range', 'date', 'named_date'})
+    SPECIFIC_RELATIVE_KEYS = frozenset({'yesterday', 'last week', 'last month'})
+    
+    # Every character a scan pattern can start with; a query holding none
+    # of them cannot match, and the fused scan skips other positions
+    TRIGGER_CHARS = frozenset('0123456789abcdfjlmnoprstwy')
+    
+    # Units matched by duration_pattern, highest priority first
+    DURATION_PRIORITY = ('hour', 'minute', 'day')
+    
     def __init__(self):
+        # Current day's (midnight, date_str, start_iso, end_iso), keyed by ordinal
+        self._day_cache = {}
+        # Relative parser results for the current second, keyed by that second
+        self._relative_cache = {}
+        
         # Relative time patterns
         self.relative_patterns = {
             'today': self._parse_today,
@@ -33,69 +131,121 @@ class TemporalParser:
             'last month': self._parse_last_month,
         }
         
-        # Hour patterns (e.g., "last hour", "past 2 hours")
-        self.hour_pattern = re.compile(
-            r'(?:last|past|previous)\s+(\d+)?\s*hours?',
-            re.IGNORECASE
-        )
-        
-        # Minute patterns (e.g., "last 30 minutes", "5 mins ago")
-        self.minute_pattern = re.compile(
-            r'(?:last|past|previous)\s+(\d+)\s*(?:minutes?|mins?)',
-            re.IGNORECASE
-        )
+        # Atomic groups and possessive quantifiers (Python 3.11+) are used
+        # wherever giving characters back could never produce a match, so
+        # failed attempts stop without backtracking
         
-        # Day patterns (e.g., "last 3 days", "past week")
-        self.day_pattern = re.compile(
-            r'(?:last|past|previous)\s+(\d+)\s*days?',
-            re.IGNORECASE
+        # Duration patterns (e.g., "last hour", "past 2 hours", "last 30 minutes",
+        # "last 3 days") - one pass for the shared prefix, unit picked after
+        self.duration_pattern = re.compile(
+            r'(?>last|past|previous)\s++(?:(\d++)?\s*+(hours?)|(\d++)\s*+(minutes?|mins?|days?))'
         )
         
         # Specific time patterns (e.g., "at 5 PM", "around 3:30")
         self.time_pattern = re.compile(
-            r'(?:at|around|about|near)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm|AM|PM)?',
-            re.IGNORECASE
+            r'(?>at|around|about|near)\s++(\d{1,2}+)(?::(\d{2}))?\s*+(am|pm)?'
         )
         
         # Time range patterns (e.g., "between 2 PM and 4 PM")
         self.time_range_pattern = re.compile(
-            r'between\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm|AM|PM)?\s+and\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm|AM|PM)?',
-            re.IGNORECASE
+            r'between\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s+and\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?'
         )
         
         # Specific date patterns (e.g., "on October 25", "2024-10-25")
         self.date_pattern = re.compile(
-            r'(?:on\s+)?(\d{4})-(\d{2})-(\d{2})',
-            re.IGNORECASE
+            r'(?:on\s+)?(\d{4})-(\d{2})-(\d{2})'
         )
         
         # Named date patterns (e.g., "October 25", "Jan 15")
         self.named_date_pattern = re.compile(
-            r'(?:on\s+)?(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?',
-            re.IGNORECASE
+            r'(?:on\s+)?((?>january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec))\s++(\d{1,2}+)(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?'
         )
         
         # Recent/Now patterns - IMPROVED for Redis cache
         self.recent_pattern = re.compile(
-            r'\b(now|recent|recently|latest|current|currently|just now|moments? ago)\b',
-            re.IGNORECASE
+            r'\b(now|recent|recently|latest|current|currently|just now|moments? ago)\b'
         )
         
         # "What happened" patterns - these should trigger "today" by default
         self.what_happened_pattern = re.compile(
-            r'\b(?:what|anything|something)\s+(?:happened|occurring|going on|activity)\b',
-            re.IGNORECASE
+            r'\b(?:what|anything|something)\s+(?:happened|occurring|going on|activity)\b'
         )
         
         # IMPROVED: "X minutes/hours ago" pattern
         self.time_ago_pattern = re.compile(
-            r'(\d+)\s*(minutes?|mins?|hours?|hrs?)\s+ago',
-            re.IGNORECASE
+            r'(\d++)\s*+(minutes?|mins?|hours?|hrs?)\s++ago'
         )
         
+        # Relative keywords share one trie-built group; when several occur,
+        # the earliest key in relative_patterns wins, as in the old cascade
+        self._relative_rank = {key: rank for rank, key in enumerate(self.relative_patterns)}
+        
+        # Fused scan: every pattern as a zero-width named lookahead, listed in
+        # cascade priority order, so a single pass over the query reports the
+        # leftmost hit of each pattern. The leading TRIGGER_CHARS class lets
+        # the engine skip positions where no pattern can start.
+        scan_patterns = [
+            ('time_ago', self.time_ago_pattern.pattern),
+            ('recent', self.recent_pattern.pattern),
+            ('what_happened', self.what_happened_pattern.pattern),
+            ('relative', _trie_regex(self.relative_patterns)),
+            ('time_range', self.time_range_pattern.pattern),
+            ('time', self.time_pattern.pattern),
+            ('duration', self.duration_pattern.pattern),
+            ('date', self.date_pattern.pattern),
+            ('named_date', self.named_date_pattern.pattern),
+        ]
+        self._scan_order = [name for name, _ in scan_patterns]
+        
+        # Patterns run case-sensitively against the lower-cased query, so an
+        # upper-case literal (escapes like \s, \d, \b aside) could never match
+        for name, pattern in scan_patterns:
+            assert re.sub(r'\\.', '', pattern).islower(), \
+                f"Temporal pattern '{name}' must be lower-case"
+        
+        # Keywords are dispatched on their first character (trie branch and
+        # TRIGGER_CHARS gate), so one starting elsewhere would never be seen
+        first_chars = {word[0] for word in (*self.relative_patterns, *_MONTHS)}
+        assert first_chars <= self.TRIGGER_CHARS, \
+            f"TRIGGER_CHARS is missing {sorted(first_chars - self.TRIGGER_CHARS)}"
+        
+        self._combined = re.compile(
+            '(?=[' + ''.join(sorted(self.TRIGGER_CHARS)) + '])(?:'
+            + '|'.join(f'(?=(?P<{name}>{pattern}))' for name, pattern in scan_patterns)
+            + ')'
+        )
+        
+        self._hs_db = self._build_hyperscan_db(
+            [pattern for _, pattern in scan_patterns]
+        )
+        
+        # Handlers receive the match of the individual pattern at the hit position
+        self._scan_patterns = {
+            'time_ago': self.time_ago_pattern,
+            'recent': self.recent_pattern,
+            'what_happened': self.what_happened_pattern,
+            'time_range': self.time_range_pattern,
+            'time': self.time_pattern,
+            'duration': self.duration_pattern,
+            'date': self.date_pattern,
+            'named_date': self.named_date_pattern,
+        }
+        self._dispatch = {
+            'time_ago': self._on_time_ago,
+            'recent': self._on_recent,
+            'what_happened': self._on_what_happened,
+            'time_range': self._on_time_range,
+            'time': self._on_specific_time,
+            'hour': self._on_hour,
+            'minute': self._on_minute,
+            'day': self._on_day,
+            'date': self._on_specific_date,
+            'named_date': self._on_named_date,
+        }
+        
         logger.info("✅ Temporal Parser initialized (Redis-aware)")
     
-    def parse(self, query: str) -> Optional[Dict[str, Any]]:
+    def parse(self, query: str) -> Optional[TemporalInfo]:
         """
         Parse temporal information from query
         
@@ -111,363 +261,461 @@ class TemporalParser:
             query: Natural language query
             
         Returns:
-            Dict with temporal information or None
+            TemporalInfo (see to_dict()) or None
         """
         query_lower = query.lower()
         
-        # PRIORITY 1: "X minutes/hours ago" - MOST SPECIFIC
-        time_ago_match = self.time_ago_pattern.search(query_lower)
-        if time_ago_match:
-            amount = int(time_ago_match.group(1))
-            unit = time_ago_match.group(2).lower()
+        if self.TRIGGER_CHARS.isdisjoint(query_lower):
+            logger.debug("ℹ️  No temporal information detected in query")
+            return None
+        
+        # Most queries carry no temporal info - let the DFA rule them out
+        if self._hs_db is not None and query_lower.isascii() and not self._hs_has_match(query_lower):
+            logger.debug("ℹ️  No temporal information detected in query")
+            return None
+        
+        # Leftmost hit position of every pattern, in one pass. Bound methods
+        # are hoisted into locals since they run once per match.
+        hits = {}
+        relative_keys = set()
+        duration_hits = {}
+        record_hit = hits.setdefault
+        add_relative = relative_keys.add
+        for match in self._combined.finditer(query_lower):
+            name = match.lastgroup
+            if name == 'relative':
+                add_relative(match.group(name))
+            elif name == 'duration':
+                text = match.group(name)
+                unit = 'hour' if 'hour' in text else 'minute' if 'min' in text else 'day'
+                duration_hits.setdefault(unit, match.start())
+            record_hit(name, match.start())
+        
+        if not hits:
+            logger.debug("ℹ️  No temporal information detected in query")
+            return None
+        
+        # One clock read per query, shared by whichever parser runs
+        now = datetime.now()
+        
+        get_hit = hits.get
+        for name in self._scan_order:
+            pos = get_hit(name)
+            if pos is None:
+                continue
             
-            if 'min' in unit:
-                logger.info(f"🕐 Detected '{amount} minutes ago'")
-                return self._parse_minutes_ago(amount)
-            elif 'hour' in unit or 'hr' in unit:
-                logger.info(f"🕐 Detected '{amount} hours ago'")
-                return self._parse_hours_ago(amount)
-        
-        # PRIORITY 2: Recent/Now patterns (optimized for Redis)
-        if self.recent_pattern.search(query_lower):
-            logger.info("🕐 Detected 'recent' query - last 2 hours (Redis window)")
-            return self._parse_recent()
-        
-        # PRIORITY 3: "What happened" without specific time → Default to TODAY
-        if self.what_happened_pattern.search(query_lower):
-            # Check if there's NO specific time mentioned
-            has_specific_time = (
-                self.time_pattern.search(query) or
-                self.time_range_pattern.search(query) or
-                self.date_pattern.search(query) or
-                self.named_date_pattern.search(query) or
-                any(rel_time in query_lower for rel_time in ['yesterday', 'last week', 'last month'])
-            )
+            if name == 'what_happened':
+                # "What happened" without specific time → Default to TODAY
+                has_specific_time = (
+                    not self.SPECIFIC_TIME_GROUPS.isdisjoint(hits)
+                    or not self.SPECIFIC_RELATIVE_KEYS.isdisjoint(relative_keys)
+                )
+                if has_specific_time:
+                    continue
+            
+            if name == 'relative':
+                return self._on_relative(min(relative_keys, key=self._relative_rank.get), now)
             
-            if not has_specific_time:
-                logger.info("🕐 'What happened' query detected - defaulting to TODAY")
-                return self._parse_today()
-        
-        # PRIORITY 4: Explicit relative time (today, yesterday, etc.)
-        for pattern_key, parser_func in self.relative_patterns.items():
-            if pattern_key in query_lower:
-                logger.info(f"🕐 Detected relative time: {pattern_key}")
-                return parser_func()
-        
-        # PRIORITY 5: Time ranges (e.g., "between 2 PM and 4 PM")
-        time_range_match = self.time_range_pattern.search(query)
-        if time_range_match:
-            logger.info("🕐 Detected time range")
-            return self._parse_time_range(time_range_match)
-        
-        # PRIORITY 6: Specific time (e.g., "at 5 PM")
-        time_match = self.time_pattern.search(query)
-        if time_match:
-            logger.info("🕐 Detected specific time")
-            return self._parse_specific_time(time_match)
-        
-        # PRIORITY 7: Hour/minute patterns
-        hour_match = self.hour_pattern.search(query_lower)
-        if hour_match:
-            hours = int(hour_match.group(1)) if hour_match.group(1) else 1
-            logger.info(f"🕐 Detected hour pattern: {hours} hours")
-            return self._parse_hours_ago(hours)
-        
-        minute_match = self.minute_pattern.search(query_lower)
-        if minute_match:
-            minutes = int(minute_match.group(1))
-            logger.info(f"🕐 Detected minute pattern: {minutes} minutes")
-            return self._parse_minutes_ago(minutes)
-        
-        # PRIORITY 8: Day patterns
-        day_match = self.day_pattern.search(query_lower)
-        if day_match:
-            days = int(day_match.group(1))
-            logger.info(f"🕐 Detected day pattern: {days} days")
-            return self._parse_days_ago(days)
-        
-        # PRIORITY 9: Specific date (ISO format)
-        date_match = self.date_pattern.search(query)
-        if date_match:
-            logger.info("🕐 Detected specific date (ISO)")
-            return self._parse_specific_date(date_match)
-        
-        # PRIORITY 10: Named date (e.g., "October 25")
-        named_date_match = self.named_date_pattern.search(query)
-        if named_date_match:
-            logger.info("🕐 Detected named date")
-            return self._parse_named_date(named_date_match)
+            if name == 'duration':
+                # Hours outrank minutes outrank days, wherever each occurs
+                name = next(unit for unit in self.DURATION_PRIORITY if unit in duration_hits)
+                pos = duration_hits[name]
+                match = self.duration_pattern.match(query_lower, pos)
+                return self._dispatch[name](match, now)
+            
+            match = self._scan_patterns[name].match(query_lower, pos)
+            return self._dispatch[name](match, now)
         
         # No temporal info found
         logger.debug("ℹ️  No temporal information detected in query")
         return None
     
+    # ==================== HYPERSCAN PREFILTER ====================
+    
+    @staticmethod
+    def _build_hyperscan_db(patterns):
+        """Compile all scan patterns into one Hyperscan block database, if available"""
+        if hyperscan is None:
+            return None
+        
+        # Hyperscan has no atomic groups or possessive quantifiers; they never
+        # change whether a scan pattern matches, so plain forms are equivalent
+        patterns = [
+            _POSSESSIVE.sub(r'\1', pattern.replace('(?>', '(?:')) for pattern in patterns
+        ]
+        
+        try:
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            db.compile(
+                expressions=[pattern.encode() for pattern in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=hyperscan.HS_FLAG_SINGLEMATCH
+            )
+            logger.info("✅ Hyperscan prefilter enabled for temporal parsing")
+            return db
+        except Exception as e:
+            logger.warning(f"⚠️  Hyperscan prefilter disabled: {e}")
+            return None
+    
+    def _hs_has_match(self, query_lower: str) -> bool:
+        """True if any scan pattern matches; stops at the first hit"""
+        try:
+            self._hs_db.scan(
+                query_lower.encode(),
+                match_event_handler=lambda *args: True
+            )
+        except hyperscan.ScanTerminated:
+            return True
+        return False
+    
+    # ==================== SCAN HANDLERS ====================
+    
+    def _on_time_ago(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 1: "X minutes/hours ago" - MOST SPECIFIC"""
+        amount = int(match.group(1))
+        unit = match.group(2)
+        
+        if 'min' in unit:
+            logger.info("🕐 Detected '%d minutes ago'", amount)
+            return self._parse_minutes_ago(amount, now)
+        logger.info("🕐 Detected '%d hours ago'", amount)
+        return self._parse_hours_ago(amount, now)
+    
+    def _on_recent(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 2: Recent/Now patterns (optimized for Redis)"""
+        logger.info("🕐 Detected 'recent' query - last 2 hours (Redis window)")
+        return self._relative_now('_parse_recent', now)
+    
+    def _on_what_happened(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 3: "What happened" without specific time"""
+        logger.info("🕐 'What happened' query detected - defaulting to TODAY")
+        return self._relative_now('_parse_today', now)
+    
+    def _on_relative(self, key: str, now: datetime) -> TemporalInfo:
+        """PRIORITY 4: Explicit relative time (today, yesterday, etc.)"""
+        logger.info("🕐 Detected relative time: %s", key)
+        return self._relative_now(self.relative_patterns[key].__name__, now)
+    
+    def _relative_now(self, parser_name: str, now: datetime) -> TemporalInfo:
+        """Result of a relative parser, shared within now's second"""
+        second = now.replace(microsecond=0)
+        results = self._relative_cache.get(second)
+        if results is None:
+            results = {}
+            self._relative_cache = {second: results}
+        
+        result = results.get(parser_name)
+        if result is None:
+            result = results[parser_name] = getattr(self, parser_name)(now)
+        return result
+    
+    def _on_time_range(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 5: Time ranges (e.g., "between 2 PM and 4 PM")"""
+        logger.info("🕐 Detected time range")
+        return self._parse_time_range(match, now)
+    
+    def _on_specific_time(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 6: Specific time (e.g., "at 5 PM")"""
+        logger.info("🕐 Detected specific time")
+        return self._parse_specific_time(match, now)
+    
+    def _on_hour(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 7: Hour patterns"""
+        hours = int(match.group(1)) if match.group(1) else 1
+        logger.info("🕐 Detected hour pattern: %d hours", hours)
+        return self._parse_hours_ago(hours, now)
+    
+    def _on_minute(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 7: Minute patterns"""
+        minutes = int(match.group(3))
+        logger.info("🕐 Detected minute pattern: %d minutes", minutes)
+        return self._parse_minutes_ago(minutes, now)
+    
+    def _on_day(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 8: Day patterns"""
+        days = int(match.group(3))
+        logger.info("🕐 Detected day pattern: %d days", days)
+        return self._parse_days_ago(days, now)
+    
+    def _on_specific_date(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 9: Specific date (ISO format)"""
+        logger.info("🕐 Detected specific date (ISO)")
+        return self._parse_specific_date(match, now)
+    
+    def _on_named_date(self, match, now: datetime) -> TemporalInfo:
+        """PRIORITY 10: Named date (e.g., "October 25")"""
+        logger.info("🕐 Detected named date")
+        return self._parse_named_date(match, now)
+    
     # ==================== RELATIVE TIME PARSERS ====================
     
-    def _parse_today(self) -> Dict[str, Any]:
+    def _day_boundaries(self, now: datetime) -> Tuple[datetime, str, str, str]:
+        """Midnight, date string and whole-day ISO bounds for now's date, computed once a day"""
+        ordinal = now.toordinal()
+        cached = self._day_cache.get(ordinal)
+        if cached is None:
+            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            date_str = midnight.strftime('%Y-%m-%d')
+            cached = (
+                midnight,
+                date_str,
+                f"{date_str}T00:00:00",
+                f"{date_str}T23:59:59.999999"
+            )
+            self._day_cache = {ordinal: cached}
+        return cached
+    
+    def _parse_today(self, now: datetime) -> TemporalInfo:
         """Parse 'today' - entire day from 00:00 to 23:59"""
-        now = datetime.now()
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        return {
-            'type': 'relative',
-            'date': now.strftime('%Y-%m-%d'),
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'Today (entire day)',
-            'redis_eligible': True  # Can check Redis for recent data
-        }
+        _, date_str, start_iso, end_iso = self._day_boundaries(now)
+        
+        return TemporalInfo(
+            type='relative',
+            date=date_str,
+            time_of_day='all_day',
+            start_time=start_iso,
+            end_time=end_iso,
+            description='Today (entire day)',
+            redis_eligible=True  # Can check Redis for recent data
+        )
     
-    def _parse_yesterday(self) -> Dict[str, Any]:
+    def _parse_yesterday(self, now: datetime) -> TemporalInfo:
         """Parse 'yesterday' - entire day"""
-        now = datetime.now()
-        yesterday = now - timedelta(days=1)
-        start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        return {
-            'type': 'relative',
-            'date': yesterday.strftime('%Y-%m-%d'),
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'Yesterday (entire day)',
-            'redis_eligible': False  # Too old for Redis (>2 hours)
-        }
+        midnight = self._day_boundaries(now)[0]
+        date_str = (midnight - self.ONE_DAY).strftime('%Y-%m-%d')
+        
+        return TemporalInfo(
+            type='relative',
+            date=date_str,
+            time_of_day='all_day',
+            start_time=f"{date_str}T00:00:00",
+            end_time=f"{date_str}T23:59:59.999999",
+            description='Yesterday (entire day)',
+            redis_eligible=False  # Too old for Redis (>2 hours)
+        )
     
-    def _parse_this_morning(self) -> Dict[str, Any]:
+    def _parse_this_morning(self, now: datetime) -> TemporalInfo:
         """Parse 'this morning' - 6 AM to 12 PM today"""
-        now = datetime.now()
-        start = now.replace(hour=6, minute=0, second=0, microsecond=0)
-        end = now.replace(hour=12, minute=0, second=0, microsecond=0)
-        
-        return {
-            'type': 'relative',
-            'date': now.strftime('%Y-%m-%d'),
-            'time_of_day': 'morning',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'This morning (6 AM - 12 PM)',
-            'redis_eligible': (now.hour < 14)  # Redis eligible if current time < 2pm
-        }
+        midnight, date_str, _, _ = self._day_boundaries(now)
+        
+        return TemporalInfo(
+            type='relative',
+            date=date_str,
+            time_of_day='morning',
+            start_time=f"{date_str}T06:00:00",
+            end_time=f"{date_str}T12:00:00",
+            description='This morning (6 AM - 12 PM)',
+            redis_eligible=(now.hour < 14)  # Redis eligible if current time < 2pm
+        )
     
-    def _parse_this_afternoon(self) -> Dict[str, Any]:
+    def _parse_this_afternoon(self, now: datetime) -> TemporalInfo:
         """Parse 'this afternoon' - 12 PM to 5 PM today"""
-        now = datetime.now()
-        start = now.replace(hour=12, minute=0, second=0, microsecond=0)
-        end = now.replace(hour=17, minute=0, second=0, microsecond=0)
-        
-        return {
-            'type': 'relative',
-            'date': now.strftime('%Y-%m-%d'),
-            'time_of_day': 'afternoon',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'This afternoon (12 PM - 5 PM)',
-            'redis_eligible': (now.hour < 19)  # Redis eligible if current time < 7pm
-        }
+        midnight, date_str, _, _ = self._day_boundaries(now)
+        
+        return TemporalInfo(
+            type='relative',
+            date=date_str,
+            time_of_day='afternoon',
+            start_time=f"{date_str}T12:00:00",
+            end_time=f"{date_str}T17:00:00",
+            description='This afternoon (12 PM - 5 PM)',
+            redis_eligible=(now.hour < 19)  # Redis eligible if current time < 7pm
+        )
     
-    def _parse_this_evening(self) -> Dict[str, Any]:
+    def _parse_this_evening(self, now: datetime) -> TemporalInfo:
         """Parse 'this evening' - 5 PM to 9 PM today"""
-        now = datetime.now()
-        start = now.replace(hour=17, minute=0, second=0, microsecond=0)
-        end = now.replace(hour=21, minute=0, second=0, microsecond=0)
-        
-        return {
-            'type': 'relative',
-            'date': now.strftime('%Y-%m-%d'),
-            'time_of_day': 'evening',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'This evening (5 PM - 9 PM)',
-            'redis_eligible': True  # Usually within Redis window
-        }
+        midnight, date_str, _, _ = self._day_boundaries(now)
+        
+        return TemporalInfo(
+            type='relative',
+            date=date_str,
+            time_of_day='evening',
+            start_time=f"{date_str}T17:00:00",
+            end_time=f"{date_str}T21:00:00",
+            description='This evening (5 PM - 9 PM)',
+            redis_eligible=True  # Usually within Redis window
+        )
     
-    def _parse_tonight(self) -> Dict[str, Any]:
+    def _parse_tonight(self, now: datetime) -> TemporalInfo:
         """Parse 'tonight' - 6 PM today to 6 AM tomorrow"""
-        now = datetime.now()
-        start = now.replace(hour=18, minute=0, second=0, microsecond=0)
-        end = (now + timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
-        
-        return {
-            'type': 'relative',
-            'date': now.strftime('%Y-%m-%d'),
-            'time_of_day': 'night',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'Tonight (6 PM - 6 AM)',
-            'redis_eligible': True
-        }
+        midnight, date_str, _, _ = self._day_boundaries(now)
+        
+        return TemporalInfo(
+            type='relative',
+            date=date_str,
+            time_of_day='night',
+            start_time=f"{date_str}T18:00:00",
+            end_time=f"{(midnight + self.ONE_DAY).strftime('%Y-%m-%d')}T06:00:00",
+            description='Tonight (6 PM - 6 AM)',
+            redis_eligible=True
+        )
     
-    def _parse_last_night(self) -> Dict[str, Any]:
+    def _parse_last_night(self, now: datetime) -> TemporalInfo:
         """Parse 'last night' - 6 PM yesterday to 6 AM today"""
-        now = datetime.now()
-        yesterday = now - timedelta(days=1)
-        start = yesterday.replace(hour=18, minute=0, second=0, microsecond=0)
-        end = now.replace(hour=6, minute=0, second=0, microsecond=0)
-        
-        return {
-            'type': 'relative',
-            'date': yesterday.strftime('%Y-%m-%d'),
-            'time_of_day': 'night',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'Last night (6 PM - 6 AM)',
-            'redis_eligible': False  # Too old for Redis
-        }
+        midnight, date_str, _, _ = self._day_boundaries(now)
+        yesterday_str = (midnight - self.ONE_DAY).strftime('%Y-%m-%d')
+        
+        return TemporalInfo(
+            type='relative',
+            date=yesterday_str,
+            time_of_day='night',
+            start_time=f"{yesterday_str}T18:00:00",
+            end_time=f"{date_str}T06:00:00",
+            description='Last night (6 PM - 6 AM)',
+            redis_eligible=False  # Too old for Redis
+        )
     
-    def _parse_this_week(self) -> Dict[str, Any]:
+    def _parse_this_week(self, now: datetime) -> TemporalInfo:
         """Parse 'this week' - Monday to Sunday"""
-        now = datetime.now()
         start_of_week = now - timedelta(days=now.weekday())
         start = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
         end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'This week',
-            'redis_eligible': False  # Too broad, use Neo4j
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='all_day',
+            start_time=start.isoformat(),
+            end_time=end.isoformat(),
+            description='This week',
+            redis_eligible=False  # Too broad, use Neo4j
+        )
     
-    def _parse_last_week(self) -> Dict[str, Any]:
+    def _parse_last_week(self, now: datetime) -> TemporalInfo:
         """Parse 'last week' - Previous Monday to Sunday"""
-        now = datetime.now()
         start_of_this_week = now - timedelta(days=now.weekday())
         start_of_last_week = start_of_this_week - timedelta(days=7)
         start = start_of_last_week.replace(hour=0, minute=0, second=0, microsecond=0)
         end = (start_of_this_week - timedelta(seconds=1)).replace(microsecond=999999)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'Last week',
-            'redis_eligible': False
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='all_day',
+            start_time=start.isoformat(),
+            end_time=end.isoformat(),
+            description='Last week',
+            redis_eligible=False
+        )
     
-    def _parse_this_month(self) -> Dict[str, Any]:
+    def _parse_this_month(self, now: datetime) -> TemporalInfo:
         """Parse 'this month' - First to last day of current month"""
-        now = datetime.now()
         start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'This month',
-            'redis_eligible': False
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='all_day',
+            start_time=start.isoformat(),
+            end_time=end.isoformat(),
+            description='This month',
+            redis_eligible=False
+        )
     
-    def _parse_last_month(self) -> Dict[str, Any]:
+    def _parse_last_month(self, now: datetime) -> TemporalInfo:
         """Parse 'last month' - Previous month"""
-        now = datetime.now()
         first_day_this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         last_day_last_month = first_day_this_month - timedelta(days=1)
         start = last_day_last_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         end = last_day_last_month.replace(hour=23, minute=59, second=59, microsecond=999999)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': 'Last month',
-            'redis_eligible': False
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='all_day',
+            start_time=start.isoformat(),
+            end_time=end.isoformat(),
+            description='Last month',
+            redis_eligible=False
+        )
     
-    def _parse_recent(self) -> Dict[str, Any]:
+    def _parse_recent(self, now: datetime) -> TemporalInfo:
         """Parse 'recent' - last 2 hours (Redis cache window) - IMPROVED"""
-        now = datetime.now()
         start = now - timedelta(hours=2)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'recent',
-            'start_time': start.isoformat(),
-            'end_time': now.isoformat(),
-            'description': 'Recent (last 2 hours)',
-            'redis_eligible': True,  # PERFECT for Redis!
-            'redis_priority': True   # Should ONLY check Redis
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='recent',
+            start_time=start.isoformat(),
+            end_time=now.isoformat(),
+            description='Recent (last 2 hours)',
+            redis_eligible=True,  # PERFECT for Redis!
+            redis_priority=True   # Should ONLY check Redis
+        )
     
     # ==================== DURATION PARSERS ====================
     
-    def _parse_hours_ago(self, hours: int) -> Dict[str, Any]:
+    def _parse_hours_ago(self, hours: int, now: datetime) -> TemporalInfo:
         """Parse 'X hours ago' - IMPROVED for Redis"""
-        now = datetime.now()
         start = now - timedelta(hours=hours)
         
         # Redis eligible if within 2 hour window
         redis_eligible = (hours <= 2)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'custom',
-            'start_time': start.isoformat(),
-            'end_time': now.isoformat(),
-            'description': f'Last {hours} hour{"s" if hours > 1 else ""}',
-            'redis_eligible': redis_eligible,
-            'redis_priority': redis_eligible  # Prioritize Redis if eligible
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='custom',
+            start_time=start.isoformat(),
+            end_time=now.isoformat(),
+            description=f'Last {hours} hour{"s" if hours > 1 else ""}',
+            redis_eligible=redis_eligible,
+            redis_priority=redis_eligible  # Prioritize Redis if eligible
+        )
     
-    def _parse_minutes_ago(self, minutes: int) -> Dict[str, Any]:
+    def _parse_minutes_ago(self, minutes: int, now: datetime) -> TemporalInfo:
         """Parse 'X minutes ago' - IMPROVED for Redis"""
-        now = datetime.now()
         start = now - timedelta(minutes=minutes)
         
-        return {
-            'type': 'relative',
-            'time_of_day': 'custom',
-            'start_time': start.isoformat(),
-            'end_time': now.isoformat(),
-            'description': f'Last {minutes} minute{"s" if minutes > 1 else ""}',
-            'redis_eligible': True,      # Always in Redis window
-            'redis_priority': True       # Should ONLY check Redis
-        }
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='custom',
+            start_time=start.isoformat(),
+            end_time=now.isoformat(),
+            description=f'Last {minutes} minute{"s" if minutes > 1 else ""}',
+            redis_eligible=True,      # Always in Redis window
+            redis_priority=True       # Should ONLY check Redis
+        )
     
-    def _parse_days_ago(self, days: int) -> Dict[str, Any]:
+    def _parse_days_ago(self, days: int, now: datetime) -> TemporalInfo:
         """Parse 'X days ago'"""
-        now = datetime.now()
-        start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        return {
-            'type': 'relative',
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': f'Last {days} day{"s" if days > 1 else ""}',
-            'redis_eligible': (days == 0)  # Only today is Redis eligible
-        }
+        start = now - timedelta(days=days)
+        
+        return TemporalInfo(
+            type='relative',
+            date=None,
+            time_of_day='all_day',
+            start_time=f"{_iso_date(start.year, start.month, start.day)}T00:00:00",
+            end_time=self._day_boundaries(now)[3],
+            description=f'Last {days} day{"s" if days > 1 else ""}',
+            redis_eligible=(days == 0)  # Only today is Redis eligible
+        )
     
     # ==================== SPECIFIC TIME PARSERS ====================
     
-    def _parse_specific_time(self, match) -> Dict[str, Any]:
+    def _parse_specific_time(self, match, now: datetime) -> TemporalInfo:
         """Parse specific time (e.g., 'at 5 PM')"""
         hour = int(match.group(1))
         minute = int(match.group(2)) if match.group(2) else 0
-        meridiem = match.group(3).upper() if match.group(3) else None
+        meridiem = match.group(3)
         
         # Convert to 24-hour format
-        if meridiem == 'PM' and hour != 12:
+        if meridiem == 'pm' and hour != 12:
             hour += 12
-        elif meridiem == 'AM' and hour == 12:
+        elif meridiem == 'am' and hour == 12:
             hour = 0
         
-        now = datetime.now()
         target_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        date_str = self._day_boundaries(now)[1]
         
         # If time is in the future today, use today; otherwise use yesterday
         if target_time > now:
             target_time = target_time - timedelta(days=1)
+            date_str = target_time.strftime('%Y-%m-%d')
         
         # Create 1-hour window around the time
         start = target_time - timedelta(minutes=30)
@@ -477,124 +725,117 @@ class TemporalParser:
         time_diff = (now - target_time).total_seconds() / 3600
         redis_eligible = (time_diff <= 2)
         
-        return {
-            'type': 'specific_time',
-            'date': target_time.strftime('%Y-%m-%d'),
-            'time_of_day': 'custom',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': f"Around {target_time.strftime('%I:%M %p')}",
-            'redis_eligible': redis_eligible
-        }
+        return TemporalInfo(
+            type='specific_time',
+            date=date_str,
+            time_of_day='custom',
+            start_time=start.isoformat(),
+            end_time=end.isoformat(),
+            description=f"Around {target_time.strftime('%I:%M %p')}",
+            redis_eligible=redis_eligible
+        )
     
-    def _parse_time_range(self, match) -> Dict[str, Any]:
+    def _parse_time_range(self, match, now: datetime) -> TemporalInfo:
         """Parse time range (e.g., 'between 2 PM and 4 PM')"""
         start_hour = int(match.group(1))
         start_minute = int(match.group(2)) if match.group(2) else 0
-        start_meridiem = match.group(3).upper() if match.group(3) else None
+        start_meridiem = match.group(3)
         
         end_hour = int(match.group(4))
         end_minute = int(match.group(5)) if match.group(5) else 0
-        end_meridiem = match.group(6).upper() if match.group(6) else None
+        end_meridiem = match.group(6)
         
         # Convert to 24-hour format
-        if start_meridiem == 'PM' and start_hour != 12:
+        if start_meridiem == 'pm' and start_hour != 12:
             start_hour += 12
-        elif start_meridiem == 'AM' and start_hour == 12:
+        elif start_meridiem == 'am' and start_hour == 12:
             start_hour = 0
         
-        if end_meridiem == 'PM' and end_hour != 12:
+        if end_meridiem == 'pm' and end_hour != 12:
             end_hour += 12
-        elif end_meridiem == 'AM' and end_hour == 12:
+        elif end_meridiem == 'am' and end_hour == 12:
             end_hour = 0
         
-        now = datetime.now()
         start_time = now.replace(hour=start_hour, minute=start_minute, second=0, microsecond=0)
         end_time = now.replace(hour=end_hour, minute=end_minute, second=0, microsecond=0)
+        date_str = self._day_boundaries(now)[1]
         
         # If times are in the future, use yesterday
         if start_time > now:
             start_time = start_time - timedelta(days=1)
             end_time = end_time - timedelta(days=1)
+            date_str = start_time.strftime('%Y-%m-%d')
         
         # Check if any part is within Redis window
         time_diff = (now - start_time).total_seconds() / 3600
         redis_eligible = (time_diff <= 2)
         
-        return {
-            'type': 'time_range',
-            'date': start_time.strftime('%Y-%m-%d'),
-            'time_of_day': 'custom',
-            'start_time': start_time.isoformat(),
-            'end_time': end_time.isoformat(),
-            'description': f"{start_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')}",
-            'redis_eligible': redis_eligible
-        }
+        return TemporalInfo(
+            type='time_range',
+            date=date_str,
+            time_of_day='custom',
+            start_time=start_time.isoformat(),
+            end_time=end_time.isoformat(),
+            description=f"{start_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')}",
+            redis_eligible=redis_eligible
+        )
     
-    def _parse_specific_date(self, match) -> Dict[str, Any]:
+    def _parse_specific_date(self, match, now: datetime) -> TemporalInfo:
         """Parse specific date (ISO format: YYYY-MM-DD)"""
         year = int(match.group(1))
         month = int(match.group(2))
         day = int(match.group(3))
         
         date = datetime(year, month, day)
-        start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Check if it's today
-        is_today = (date.date() == datetime.now().date())
-        
-        return {
-            'type': 'specific_date',
-            'date': date.strftime('%Y-%m-%d'),
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': f"{date.strftime('%B %d, %Y')}",
-            'redis_eligible': is_today
-        }
+        iso_date = _iso_date(year, month, day)
+        
+        # Check if it's today, against the cached date string
+        is_today = (iso_date == self._day_boundaries(now)[1])
+        
+        return TemporalInfo(
+            type='specific_date',
+            date=date.strftime('%Y-%m-%d'),
+            time_of_day='all_day',
+            start_time=f"{iso_date}T00:00:00",
+            end_time=f"{iso_date}T23:59:59.999999",
+            description=f"{date.strftime('%B %d, %Y')}",
+            redis_eligible=is_today
+        )
     
-    def _parse_named_date(self, match) -> Dict[str, Any]:
+    def _parse_named_date(self, match, now: datetime) -> TemporalInfo:
         """Parse named date (e.g., 'October 25', 'Jan 15 2024')"""
-        month_name = match.group(1).lower()
+        month_name = match.group(1)
         day = int(match.group(2))
-        year = int(match.group(3)) if match.group(3) else datetime.now().year
-        
-        # Month mapping
-        months = {
-            'january': 1, 'jan': 1,
-            'february': 2, 'feb': 2,
-            'march': 3, 'mar': 3,
-            'april': 4, 'apr': 4,
-            'may': 5,
-            'june': 6, 'jun': 6,
-            'july': 7, 'jul': 7,
-            'august': 8, 'aug': 8,
-            'september': 9, 'sep': 9,
-            'october': 10, 'oct': 10,
-            'november': 11, 'nov': 11,
-            'december': 12, 'dec': 12
-        }
+        year = int(match.group(3)) if match.group(3) else now.year
         
-        month = months.get(month_name, 1)
+        month = _MONTHS.get(month_name, 1)
         
         date = datetime(year, month, day)
-        start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Check if it's today
-        is_today = (date.date() == datetime.now().date())
-        
-        return {
-            'type': 'specific_date',
-            'date': date.strftime('%Y-%m-%d'),
-            'time_of_day': 'all_day',
-            'start_time': start.isoformat(),
-            'end_time': end.isoformat(),
-            'description': f"{date.strftime('%B %d, %Y')}",
-            'redis_eligible': is_today
-        }
+        iso_date = _iso_date(year, month, day)
+        
+        # Check if it's today, against the cached date string
+        is_today = (iso_date == self._day_boundaries(now)[1])
+        
+        return TemporalInfo(
+            type='specific_date',
+            date=date.strftime('%Y-%m-%d'),
+            time_of_day='all_day',
+            start_time=f"{iso_date}T00:00:00",
+            end_time=f"{iso_date}T23:59:59.999999",
+            description=f"{date.strftime('%B %d, %Y')}",
+            redis_eligible=is_today
+        )
+
+
+# Singleton instance, built on first access so importing this module
+# does not compile the patterns (or the Hyperscan database) up front
+_temporal_parser: Optional[TemporalParser] = None
 
 
-# Singleton instance
-temporal_parser = TemporalParser()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    global _temporal_parser
+    if name == 'temporal_parser':
+        if _temporal_parser is None:
+            _temporal_parser = TemporalParser()
+        return _temporal_parser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -3,18 +3,243 @@ AI Service Client
 Communicates with the GPU server (192.168.0.9:8888) for AI inference
 """
 
+import asyncio
+import base64
+import hashlib
 import httpx
 import logging
+import orjson
+import os
+import random
+import threading
+import time
 import cv2  # ✅ ADDED: Missing import for panoramic stitching
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple, Union
 from PIL import Image
-import io
 import numpy as np
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Pillow's JPEG quality when none is given, kept for the single-frame uploads
+DEFAULT_JPEG_QUALITY = 75
+
+# Longest image side uploaded per endpoint (YOLO runs at 640, BLIP at 384)
+DETECT_MAX_SIDE = 1280
+CAPTION_MAX_SIDE = 384
+BATCH_CAPTION_MAX_SIDE = 1920
+
+# Frames may be PIL images or OpenCV (BGR) numpy arrays
+ImageInput = Union[Image.Image, np.ndarray]
+
+# Multipart boundary for uploads, fixed per process (random, so it can't collide with JPEG data)
+MULTIPART_BOUNDARY = os.urandom(16).hex()
+
+# Threads encoding batch-caption frames in parallel (cv2 releases the GIL)
+JPEG_ENCODE_WORKERS = min(8, os.cpu_count() or 1)
+
+# Threads running OpenCV panorama stitching (seconds of CPU per panorama)
+STITCH_WORKERS = 2
+
+# Embeddings kept in memory, keyed by text digest (captions repeat across frames)
+EMBEDDING_CACHE_MAX_ENTRIES = 2048
+
+# Concurrent embedding requests are coalesced into one /embed/batch call:
+# a batch is sent when it is full or when the window since its first request ends
+EMBEDDING_BATCH_MAX_SIZE = 32
+EMBEDDING_BATCH_WINDOW = 0.01  # seconds
+
+# Ask the service for base64 float16 embeddings (older services ignore it and send lists)
+EMBEDDING_ENCODING = "fp16_b64"
+
+# Consecutive server failures before an endpoint's circuit opens, and how long
+# it stays open before a single probe request is let through
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_OPEN_SECONDS = 30.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+
+class _CircuitBreaker:
+    """Fails fast for an endpoint after repeated server failures"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+    
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if time.monotonic() - self.opened_at < CIRCUIT_OPEN_SECONDS:
+            return False
+        # Cool-down over: let this request probe, hold the rest for another window
+        self.state = self.HALF_OPEN
+        self.opened_at = time.monotonic()
+        return True
+    
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"✅ AI service '{self.name}' recovered - circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"⚠️ AI service '{self.name}' failing - circuit open for {CIRCUIT_OPEN_SECONDS:.0f}s"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def _rescale_detections(result: Dict[str, Any], factor: float) -> Dict[str, Any]:
+    """Map bounding boxes from a downscaled upload back to source-image pixels"""
+    for det in result.get("detections", []):
+        bbox = det.get("bbox")
+        if isinstance(bbox, dict):
+            det["bbox"] = {k: v * factor if isinstance(v, (int, float)) else v for k, v in bbox.items()}
+        elif isinstance(bbox, (list, tuple)):
+            det["bbox"] = [v * factor for v in bbox]
+    return result
+
+
+def _unpack_fp16_b64(data: str) -> np.ndarray:
+    """Decode base64 little-endian float16 vectors to float32"""
+    return np.frombuffer(base64.b64decode(data), dtype="<f2").astype(np.float32)
+
+
+def _build_multipart(
+    files: Union[Dict[str, Tuple], List[Tuple[str, Tuple]]],
+    data: Optional[Dict[str, Any]] = None
+) -> Tuple[bytes, str]:
+    """
+    Encode form fields and (filename, bytes, content_type) files as multipart/form-data
+    
+    Returns:
+        (body, content-type header value)
+    """
+    dash_boundary = f"--{MULTIPART_BOUNDARY}".encode()
+    parts: List[bytes] = []
+    
+    for name, value in (data or {}).items():
+        parts += [
+            dash_boundary,
+            f'\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode(),
+            str(value).encode(),
+            b"\r\n",
+        ]
+    
+    for name, (filename, content, content_type) in (files.items() if isinstance(files, dict) else files):
+        parts += [
+            dash_boundary,
+            (
+                f'\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"'
+                f'\r\nContent-Type: {content_type}\r\n\r\n'
+            ).encode(),
+            content,
+            b"\r\n",
+        ]
+    
+    parts += [dash_boundary, b"--\r\n"]
+    return b"".join(parts), f"multipart/form-data; boundary={MULTIPART_BOUNDARY}"
+
+
+def _is_server_failure(exc: Exception) -> bool:
+    """Timeouts, connection errors and 5xx responses count against the breaker"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+# Bounded exponential backoff with jitter for transient failures of idempotent calls
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.2  # seconds
+RETRY_MAX_DELAY = 2.0  # seconds
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Timeouts and gateway/unavailable responses are worth retrying"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TimeoutException)
+
+
+async def _retry(request: Callable[[], Awaitable[Any]]) -> Any:
+    """Await request(), retrying transient failures with jittered exponential backoff"""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return await request()
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS - 1 or not _is_transient(e):
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"⚠️ AI service request failed ({e}) - retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+def _content_key(*parts: bytes) -> bytes:
+    """Stable 128-bit blake2b digest of the parts (unlike hash(), same across runs)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.digest()
+
+
+def _downscale_ratio(width: int, height: int, max_side: Optional[int]) -> float:
+    """Scale factor that fits the longest side within max_side (never upscales)"""
+    if not max_side:
+        return 1.0
+    return min(1.0, max_side / max(width, height))
+
+
+def _image_size(image: ImageInput) -> Tuple[int, int]:
+    """(width, height) of a PIL image or numpy frame"""
+    if isinstance(image, np.ndarray):
+        return image.shape[1], image.shape[0]
+    return image.size
+
+
+def _encode_jpeg(
+    image: ImageInput,
+    quality: int = DEFAULT_JPEG_QUALITY,
+    max_side: Optional[int] = None
+) -> bytes:
+    """Encode a PIL image or BGR numpy frame as JPEG bytes with OpenCV (libjpeg-turbo)"""
+    if isinstance(image, np.ndarray):
+        # OpenCV frames are already BGR - hand them straight to the encoder
+        arr = image
+    else:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        arr = np.asarray(image)
+        if arr.ndim == 3:
+            arr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+    
+    width, height = _image_size(image)
+    ratio = _downscale_ratio(width, height, max_side)
+    if ratio < 1.0:
+        dsize = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+        arr = cv2.resize(arr, dsize, interpolation=cv2.INTER_AREA)
+    
+    ok, buf = cv2.imencode(".jpg", arr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
 
 class AIServiceClient:
     """Client for communicating with AI Service on GPU server"""
@@ -22,29 +247,120 @@ class AIServiceClient:
     def __init__(self):
         self.base_url = settings.AI_SERVICE_URL
         self.timeout = settings.AI_SERVICE_TIMEOUT
-        self.client = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self._encode_executor = ThreadPoolExecutor(
+            max_workers=JPEG_ENCODE_WORKERS,
+            thread_name_prefix="jpeg-encode"
+        )
+        self._stitch_executor = ThreadPoolExecutor(
+            max_workers=STITCH_WORKERS,
+            thread_name_prefix="stitch"
+        )
+        # Stitchers aren't thread-safe, so each stitching thread keeps its own per mode
+        self._stitchers = threading.local()
+        self._embedding_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        
+        # Identical requests already on the wire, keyed by (endpoint, content digest)
+        self._inflight: Dict[Tuple[str, bytes], asyncio.Task] = {}
+        
+        # Pending (text, future) pairs for the open embedding batch
+        self._embed_queue: List[Tuple[str, asyncio.Future]] = []
+        self._embed_batch_full: Optional[asyncio.Event] = None
+        self._embed_flushers: set = set()
+        
+        # One breaker per endpoint so a failing model doesn't block the others
+        self._breakers = {
+            name: _CircuitBreaker(name)
+            for name in ("detect", "caption", "embed", "caption_batch", "embed_batch", "stitch")
+        }
         logger.info(f"🤖 AI Service Client initialized: {self.base_url}")
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared pooled client, created on first use inside the event loop"""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_keepalive_connections=100, max_connections=200)
+            )
+        return self.client
+    
+    async def close(self):
+        """Close the shared client and worker threads (called at application shutdown)"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            logger.info("✅ AI Service client closed")
+        self._encode_executor.shutdown(wait=False)
+        self._stitch_executor.shutdown(wait=False)
+    
+    async def _get_json(self, path: str, timeout: float) -> Dict[str, Any]:
+        """GET a JSON document from the AI service"""
+        response = await self._get_client().get(f"{self.base_url}{path}", timeout=timeout)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    async def _post(self, endpoint: str, path: str, retry: bool = False, **kwargs) -> Dict[str, Any]:
+        """POST to the AI service; idempotent calls may retry transient failures"""
+        # Serialize JSON bodies once with orjson (also reused across retries)
+        if "json" in kwargs:
+            kwargs["content"] = orjson.dumps(kwargs.pop("json"))
+            kwargs["headers"] = {**kwargs.get("headers", {}), "content-type": "application/json"}
+        
+        # Uploads are assembled in one join instead of httpx's per-request multipart encoder
+        if "files" in kwargs:
+            body, content_type = _build_multipart(kwargs.pop("files"), kwargs.pop("data", None))
+            kwargs["content"] = body
+            kwargs["headers"] = {**kwargs.get("headers", {}), "content-type": content_type}
+        
+        if retry:
+            return await _retry(lambda: self._post_once(endpoint, path, **kwargs))
+        return await self._post_once(endpoint, path, **kwargs)
+    
+    async def _post_once(self, endpoint: str, path: str, **kwargs) -> Dict[str, Any]:
+        """POST to the AI service through the endpoint's circuit breaker"""
+        breaker = self._breakers[endpoint]
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"{endpoint} circuit open")
+        
+        try:
+            response = await self._get_client().post(f"{self.base_url}{path}", **kwargs)
+            response.raise_for_status()
+        except Exception as e:
+            if _is_server_failure(e):
+                breaker.record_failure()
+            raise
+        
+        breaker.record_success()
+        return orjson.loads(response.content)
+    
+    async def _single_flight(
+        self,
+        key: Tuple[str, bytes],
+        request: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Share one in-flight request between concurrent identical callers"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(request())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shielded so one caller being cancelled doesn't cancel the others' request
+        return dict(await asyncio.shield(task))
+    
     async def __aenter__(self):
         """Async context manager entry"""
-        self.client = httpx.AsyncClient(
-            timeout=httpx.Timeout(self.timeout),
-            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
-        )
+        self._get_client()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.client:
-            await self.client.aclose()
+        """Async context manager exit - the shared client stays open for other callers"""
+        return None
     
     async def health_check(self) -> Dict[str, Any]:
         """Check AI service health"""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health")
-                response.raise_for_status()
-                return response.json()
+            return await _retry(lambda: self._get_json("/health", timeout=5.0))
         except Exception as e:
             logger.error(f"AI Service health check failed: {e}")
             return {"status": "unhealthy", "error": str(e)}
@@ -52,65 +368,57 @@ class AIServiceClient:
     async def get_gpu_info(self) -> Dict[str, Any]:
         """Get GPU information from AI service"""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/gpu-info")
-                response.raise_for_status()
-                return response.json()
+            return await _retry(lambda: self._get_json("/gpu-info", timeout=5.0))
         except Exception as e:
             logger.error(f"Failed to get GPU info: {e}")
             return {"error": str(e)}
     
     async def generate_caption(
         self,
-        image: Image.Image,
-        prompt: str = "a surveillance camera view of"
+        image: ImageInput,
+        prompt: str = "a surveillance camera view of",
+        max_side: int = CAPTION_MAX_SIDE
     ) -> Dict[str, Any]:
         """
         Generate caption for an image
         
         Args:
-            image: PIL Image object
+            image: PIL Image or OpenCV (BGR) numpy frame
             prompt: Optional prompt to guide caption generation
+            max_side: Downscale so the longest side is at most this before upload
             
         Returns:
             Dictionary with caption and metadata
         """
         try:
-            # Convert PIL Image to bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG')
-            img_byte_arr.seek(0)
+            # Encode (downscaled) JPEG bytes
+            jpeg_bytes = _encode_jpeg(image, max_side=max_side)
             
             # Prepare multipart form data
             files = {
-                'file': ('image.jpg', img_byte_arr, 'image/jpeg')
+                'file': ('image.jpg', jpeg_bytes, 'image/jpeg')
             }
             data = {
                 'prompt': prompt
             }
             
-            # Send request
-            if not self.client:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/caption",
-                        files=files,
-                        data=data
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-            else:
-                response = await self.client.post(
-                    f"{self.base_url}/caption",
+            # Send request (shared with concurrent callers captioning the same frame)
+            result = await self._single_flight(
+                ("caption", _content_key(jpeg_bytes, prompt.encode("utf-8"))),
+                lambda: self._post(
+                    "caption",
+                    "/caption",
+                    retry=True,
                     files=files,
                     data=data
                 )
-                response.raise_for_status()
-                result = response.json()
+            )
             
-            logger.info(f"✅ Caption generated: {result.get('caption', '')[:50]}...")
+            logger.info("✅ Caption generated: %.50s...", result.get('caption', ''))
             return result
             
+        except CircuitOpenError:
+            return {"success": False, "error": "circuit_open"}
         except httpx.TimeoutException:
             logger.error("Caption generation timed out")
             return {"success": False, "error": "Request timed out"}
@@ -120,55 +428,51 @@ class AIServiceClient:
     
     async def detect_objects(
         self,
-        image: Image.Image,
-        confidence_threshold: float = 0.5
+        image: ImageInput,
+        confidence_threshold: float = 0.5,
+        max_side: int = DETECT_MAX_SIDE
     ) -> Dict[str, Any]:
         """
         Detect objects in an image using YOLO
         
         Args:
-            image: PIL Image object
+            image: PIL Image or OpenCV (BGR) numpy frame
             confidence_threshold: Minimum confidence for detections
+            max_side: Downscale so the longest side is at most this before upload
             
         Returns:
             Dictionary with detections list
         """
         try:
-            # Convert PIL Image to bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='JPEG')
-            img_byte_arr.seek(0)
+            # Encode (downscaled) JPEG bytes
+            ratio = _downscale_ratio(*_image_size(image), max_side)
+            jpeg_bytes = _encode_jpeg(image, max_side=max_side)
             
             # Prepare request
             files = {
-                'file': ('image.jpg', img_byte_arr, 'image/jpeg')
+                'file': ('image.jpg', jpeg_bytes, 'image/jpeg')
             }
             params = {
                 'confidence': confidence_threshold
             }
             
             # Send request
-            if not self.client:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/detect",
-                        files=files,
-                        params=params
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-            else:
-                response = await self.client.post(
-                    f"{self.base_url}/detect",
-                    files=files,
-                    params=params
-                )
-                response.raise_for_status()
-                result = response.json()
-            
-            logger.info(f"✅ Detected {result.get('count', 0)} objects")
+            result = await self._post(
+                "detect",
+                "/detect",
+                files=files,
+                params=params
+            )
+            
+            # Report boxes in the caller's image coordinates
+            if ratio < 1.0:
+                _rescale_detections(result, 1.0 / ratio)
+            
+            logger.info("✅ Detected %s objects", result.get('count', 0))
             return result
             
+        except CircuitOpenError:
+            return {"success": False, "error": "circuit_open"}
         except httpx.TimeoutException:
             logger.error("Object detection timed out")
             return {"success": False, "error": "Request timed out"}
@@ -186,28 +490,96 @@ class AIServiceClient:
         Returns:
             Dictionary with embedding vector
         """
+        cache_key = _content_key(text.encode("utf-8"))
+        cached = self._embedding_cache.get(cache_key)
+        if cached is not None:
+            self._embedding_cache.move_to_end(cache_key)
+            logger.debug("✅ Embedding cache hit")
+            return dict(cached)
+        
+        result = await self._single_flight(
+            ("embed", cache_key),
+            lambda: self._queue_embedding(text)
+        )
+        
+        if result.get("success"):
+            self._embedding_cache[cache_key] = result
+            if len(self._embedding_cache) > EMBEDDING_CACHE_MAX_ENTRIES:
+                self._embedding_cache.popitem(last=False)
+            return dict(result)
+        return result
+    
+    async def _queue_embedding(self, text: str) -> Dict[str, Any]:
+        """Add text to the open embedding batch and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._embed_queue.append((text, future))
+        
+        if self._embed_batch_full is None:
+            # First request of a new batch - schedule its flush
+            self._embed_batch_full = asyncio.Event()
+            task = asyncio.create_task(self._flush_embeddings(self._embed_batch_full))
+            self._embed_flushers.add(task)
+            task.add_done_callback(self._embed_flushers.discard)
+        elif len(self._embed_queue) >= EMBEDDING_BATCH_MAX_SIZE:
+            self._embed_batch_full.set()
+        
+        return await future
+    
+    async def _flush_embeddings(self, batch_full: asyncio.Event):
+        """Send the open batch once it fills up or its window ends"""
+        try:
+            await asyncio.wait_for(batch_full.wait(), EMBEDDING_BATCH_WINDOW)
+        except asyncio.TimeoutError:
+            pass
+        
+        # Detach the batch so requests arriving from now on open a new one
+        batch, self._embed_queue = self._embed_queue, []
+        self._embed_batch_full = None
+        
         try:
-            payload = {"text": text}
-            
-            if not self.client:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/embed",
-                        json=payload
-                    )
-                    response.raise_for_status()
-                    result = response.json()
+            if len(batch) == 1:
+                results = [await self._request_embedding(batch[0][0])]
             else:
-                response = await self.client.post(
-                    f"{self.base_url}/embed",
-                    json=payload
-                )
-                response.raise_for_status()
-                result = response.json()
+                batch_result = await self.batch_generate_embeddings([text for text, _ in batch])
+                if batch_result.get("success"):
+                    results = [
+                        {"success": True, "embedding": embedding, "dimensions": len(embedding)}
+                        for embedding in batch_result.get("embeddings", [])
+                    ]
+                else:
+                    results = []
+                
+                if len(results) != len(batch):
+                    error = batch_result.get("error", "Batch embedding returned wrong count")
+                    results = [{"success": False, "error": error}] * len(batch)
+        except Exception as e:
+            logger.error(f"Embedding batch failed: {e}")
+            results = [{"success": False, "error": str(e)}] * len(batch)
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(dict(result))
+    
+    async def _request_embedding(self, text: str) -> Dict[str, Any]:
+        """Single-text call to the /embed endpoint"""
+        try:
+            payload = {"text": text, "encoding": EMBEDDING_ENCODING}
+            
+            result = await self._post(
+                "embed",
+                "/embed",
+                retry=True,
+                json=payload
+            )
             
-            logger.debug(f"✅ Generated {result.get('dimensions', 0)}-dim embedding")
+            if "embedding_b64" in result:
+                result["embedding"] = _unpack_fp16_b64(result.pop("embedding_b64")).tolist()
+            
+            logger.debug("✅ Generated %s-dim embedding", result.get('dimensions', 0))
             return result
             
+        except CircuitOpenError:
+            return {"success": False, "error": "circuit_open"}
         except httpx.TimeoutException:
             logger.error("Embedding generation timed out")
             return {"success": False, "error": "Request timed out"}
@@ -217,32 +589,38 @@ class AIServiceClient:
 
     async def generate_batch_caption(
         self,
-        images: List[Image.Image],
+        images: List[ImageInput],
         prompt: str = None
     ) -> Dict[str, Any]:
         """
         Generate a comprehensive caption from multiple frames (batch processing)
         
         Args:
-            images: List of PIL Image objects (accumulated frames)
+            images: List of PIL Images or OpenCV (BGR) frames (accumulated frames)
             prompt: Optional custom prompt (uses enhanced default on AI service if not provided)
             
         Returns:
             Dictionary with comprehensive caption and metadata
         """
         try:
-            import time
             start_time = time.time()
             
-            logger.info(f"🎬 Generating batch caption for {len(images)} frames")
+            logger.info("🎬 Generating batch caption for %d frames", len(images))
+            
+            # Encode all frames in parallel, off the event loop
+            loop = asyncio.get_running_loop()
+            encoded = await asyncio.gather(*(
+                loop.run_in_executor(
+                    self._encode_executor, _encode_jpeg, image, 90, BATCH_CAPTION_MAX_SIDE
+                )
+                for image in images
+            ))
             
             # Prepare multipart form data with multiple images
-            files = []
-            for i, image in enumerate(images):
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='JPEG', quality=90)
-                img_byte_arr.seek(0)
-                files.append(('files', (f'frame_{i}.jpg', img_byte_arr, 'image/jpeg')))
+            files = [
+                ('files', (f'frame_{i}.jpg', jpeg_bytes, 'image/jpeg'))
+                for i, jpeg_bytes in enumerate(encoded)
+            ]
             
             # Build data payload
             data = {
@@ -254,32 +632,24 @@ class AIServiceClient:
                 data['prompt'] = prompt
             
             # Send request to batch caption endpoint
-            if not self.client:
-                async with httpx.AsyncClient(timeout=self.timeout * 2) as client:
-                    response = await client.post(
-                        f"{self.base_url}/caption/batch",
-                        files=files,
-                        data=data
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-            else:
-                response = await self.client.post(
-                    f"{self.base_url}/caption/batch",
-                    files=files,
-                    data=data
-                )
-                response.raise_for_status()
-                result = response.json()
+            result = await self._post(
+                "caption_batch",
+                "/caption/batch",
+                files=files,
+                data=data,
+                timeout=self.timeout * 2
+            )
             
             processing_time = time.time() - start_time
             result["processing_time"] = processing_time
             
-            logger.info(f"✅ Batch caption generated in {processing_time:.2f}s")
-            logger.info(f"   Caption: {result.get('caption', '')[:100]}...")
+            logger.info("✅ Batch caption generated in %.2fs", processing_time)
+            logger.info("   Caption: %.100s...", result.get('caption', ''))
             
             return result
             
+        except CircuitOpenError:
+            return {"success": False, "error": "circuit_open"}
         except httpx.TimeoutException:
             logger.error("Batch caption generation timed out")
             return {"success": False, "error": "Request timed out"}
@@ -295,18 +665,19 @@ class AIServiceClient:
             if len(frames) < 2:
                 return {"success": False, "error": "Need at least 2 frames"}
             
-            logger.info(f"🎨 Stitching {len(frames)} frames in {mode} mode")
+            # Validate up front instead of letting the Stitcher copy/convert each frame
+            if any(f.ndim != 3 or f.shape[2] != 3 for f in frames):
+                return {"success": False, "error": "Frames must be 3-channel BGR images"}
+            if len({f.dtype for f in frames}) != 1:
+                return {"success": False, "error": "Frames must share the same dtype"}
+            frames = [np.ascontiguousarray(f) for f in frames]
             
-            # Use OpenCV Stitcher
-            if mode == "scans":
-                stitcher = cv2.Stitcher_create(cv2.Stitcher_SCANS)
-            else:
-                stitcher = cv2.Stitcher_create(cv2.Stitcher_PANORAMA)
+            logger.info("🎨 Stitching %d frames in %s mode", len(frames), mode)
             
-            status, stitched = stitcher.stitch(frames)
+            status, stitched = self._get_stitcher(mode).stitch(frames)
             
             if status == cv2.Stitcher_OK:
-                logger.info(f"✅ Panorama stitched successfully: {stitched.shape}")
+                logger.info("✅ Panorama stitched successfully: %s", stitched.shape)
                 return {
                     "success": True,
                     "stitched_frame": stitched,
@@ -320,15 +691,98 @@ class AIServiceClient:
                     cv2.Stitcher_ERR_CAMERA_PARAMS_ADJUST_FAIL: "Camera parameters adjustment failed"
                 }
                 error_msg = error_map.get(status, f"Stitching failed with status code: {status}")
-                logger.warning(f"⚠️ {error_msg}")
+                logger.warning("⚠️ %s", error_msg)
                 return {"success": False, "error": error_msg}
                 
         except Exception as e:
-            logger.error(f"❌ Stitching error: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("❌ Stitching error: %s", e)
             return {"success": False, "error": str(e)}
     
+    def _get_stitcher(self, mode: str):
+        """OpenCV Stitcher for this thread and mode, created once and reused"""
+        cache = getattr(self._stitchers, "by_mode", None)
+        if cache is None:
+            cache = self._stitchers.by_mode = {}
+        
+        stitcher = cache.get(mode)
+        if stitcher is None:
+            if mode == "scans":
+                stitcher = cv2.Stitcher_create(cv2.Stitcher_SCANS)
+            else:
+                stitcher = cv2.Stitcher_create(cv2.Stitcher_PANORAMA)
+            cache[mode] = stitcher
+        return stitcher
+    
+    async def stitch_panoramic_frames_async(self, frames: List[np.ndarray], mode: str = "panorama"):
+        """
+        Stitch frames into panorama on the stitching thread pool
+        
+        OpenCV releases the GIL while stitching, so this keeps the event loop
+        (and every other camera stream) responsive.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._stitch_executor,
+            self.stitch_panoramic_frames,
+            frames,
+            mode
+        )
+    
+    async def stitch_panoramic_frames_remote(self, frames: List[np.ndarray], mode: str = "panorama"):
+        """
+        Stitch frames into panorama on the GPU server, falling back to local stitching
+        
+        Args:
+            frames: OpenCV (BGR) frames, ordered left to right
+            mode: "panorama" or "scans"
+            
+        Returns:
+            Same shape as stitch_panoramic_frames
+        """
+        if len(frames) < 2:
+            return {"success": False, "error": "Need at least 2 frames"}
+        
+        try:
+            loop = asyncio.get_running_loop()
+            encoded = await asyncio.gather(*(
+                loop.run_in_executor(self._encode_executor, _encode_jpeg, frame, 90)
+                for frame in frames
+            ))
+            files = [
+                ('files', (f'frame_{i}.jpg', jpeg_bytes, 'image/jpeg'))
+                for i, jpeg_bytes in enumerate(encoded)
+            ]
+            
+            result = await self._post(
+                "stitch",
+                "/stitch",
+                files=files,
+                params={"mode": mode},
+                timeout=self.timeout * 2
+            )
+            
+            # Non-overlapping frames won't stitch locally either
+            if not result.get("success"):
+                return result
+            
+            stitched = cv2.imdecode(
+                np.frombuffer(base64.b64decode(result["stitched_image_base64"]), np.uint8),
+                cv2.IMREAD_COLOR
+            )
+            if stitched is None:
+                raise ValueError("Could not decode stitched frame")
+            
+            return {
+                "success": True,
+                "stitched_frame": stitched,
+                "width": stitched.shape[1],
+                "height": stitched.shape[0]
+            }
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Remote stitching unavailable ({e}) - stitching locally")
+            return await self.stitch_panoramic_frames_async(frames, mode)
+    
     async def batch_generate_embeddings(
         self,
         texts: List[str],
@@ -337,38 +791,44 @@ class AIServiceClient:
         """
         Generate embeddings for multiple texts
         
+        Texts are sent in chunks of batch_size, all in flight at once.
+        
         Args:
             texts: List of input texts
             batch_size: Processing batch size
             
         Returns:
-            Dictionary with embeddings list
+            Dictionary with one embedding per text, in order, or success False
+            if any chunk failed
         """
         try:
-            payload = {
-                "texts": texts,
-                "batch_size": batch_size
-            }
-            
-            if not self.client:
-                async with httpx.AsyncClient(timeout=self.timeout * 2) as client:
-                    response = await client.post(
-                        f"{self.base_url}/embed/batch",
-                        json=payload
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-            else:
-                response = await self.client.post(
-                    f"{self.base_url}/embed/batch",
-                    json=payload
-                )
-                response.raise_for_status()
-                result = response.json()
+            chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            results = await asyncio.gather(*(
+                self._post_embed_batch(chunk, batch_size) for chunk in chunks
+            ))
+            
+            # A failed or short chunk would shift every later vector onto the wrong text
+            for index, chunk_result in enumerate(results):
+                if not chunk_result.get("success", True):
+                    logger.error("Batch embedding chunk %s failed: %s", index, chunk_result.get("error"))
+                    return {"success": False, "error": chunk_result.get("error") or f"chunk {index} failed"}
+            
+            result = dict(results[0]) if results else {"success": True}
+            result["embeddings"] = [e for r in results for e in r.get("embeddings") or []]
+            result["count"] = len(result["embeddings"])
+            
+            if result["count"] != len(texts):
+                logger.error("Batch embedding returned %s vectors for %s texts", result["count"], len(texts))
+                return {
+                    "success": False,
+                    "error": f"Expected {len(texts)} embeddings, got {result['count']}"
+                }
             
-            logger.info(f"✅ Generated {result.get('count', 0)} embeddings")
+            logger.info("✅ Generated %s embeddings", result['count'])
             return result
             
+        except CircuitOpenError:
+            return {"success": False, "error": "circuit_open"}
         except httpx.TimeoutException:
             logger.error("Batch embedding generation timed out")
             return {"success": False, "error": "Request timed out"}
@@ -376,9 +836,30 @@ class AIServiceClient:
             logger.error(f"Batch embedding generation failed: {e}")
             return {"success": False, "error": str(e)}
     
+    async def _post_embed_batch(self, texts: List[str], batch_size: int) -> Dict[str, Any]:
+        """One /embed/batch call, with packed vectors unpacked to lists"""
+        payload = {
+            "texts": texts,
+            "batch_size": batch_size,
+            "encoding": EMBEDDING_ENCODING
+        }
+        
+        result = await self._post(
+            "embed_batch",
+            "/embed/batch",
+            retry=True,
+            json=payload,
+            timeout=self.timeout * 2
+        )
+        
+        if "embeddings_b64" in result:
+            vectors = _unpack_fp16_b64(result.pop("embeddings_b64"))
+            result["embeddings"] = vectors.reshape(-1, result["dimensions"]).tolist()
+        return result
+    
     async def process_frame(
         self,
-        image: Image.Image,
+        image: ImageInput,
         camera_id: str,
         timestamp: str
     ) -> Dict[str, Any]:
@@ -386,7 +867,7 @@ class AIServiceClient:
         Complete frame processing pipeline
         
         Args:
-            image: PIL Image object
+            image: PIL Image or OpenCV (BGR) numpy frame
             camera_id: Camera identifier
             timestamp: Frame timestamp
             
@@ -400,13 +881,15 @@ class AIServiceClient:
         }
         
         try:
-            # Step 1: Object Detection (fast pre-check)
-            detection_result = await self.detect_objects(image)
+            # Steps 1-2: Object detection and caption generation are independent,
+            # so run them concurrently
+            detection_result, caption_result = await asyncio.gather(
+                self.detect_objects(image),
+                self.generate_caption(image)
+            )
             if detection_result.get("success"):
                 results["detections"] = detection_result["detections"]
             
-            # Step 2: Caption Generation
-            caption_result = await self.generate_caption(image)
             if caption_result.get("success"):
                 results["caption"] = caption_result["caption"]
                 results["confidence"] = caption_result.get("confidence", 0.0)
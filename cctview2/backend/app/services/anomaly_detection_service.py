@@ -6,12 +6,19 @@ Checks captions from Redis against anomaly rules from Neo4j
 Uses Ollama LLM for semantic similarity matching
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import hashlib
 import logging
-import json
+import re
+import secrets
+import time
+from collections import OrderedDict
 from datetime import datetime
-import uuid
+from dateutil import parser as _dateutil_parser
+import numpy as np
 import ollama
+import orjson
 from app.core.config import settings
 
 from app.db.neo4j.client import neo4j_client
@@ -21,6 +28,72 @@ from app.services.notification_service import notification_service
 
 logger = logging.getLogger(__name__)
 
+# Ollama verdicts per (caption, rule text), kept in process and shared via Redis
+# (static scenes produce the same caption frame after frame)
+SIMILARITY_CACHE_MAX_ENTRIES = 4096
+SIMILARITY_CACHE_TTL = 600  # seconds
+
+# Enabled rules per camera, cached in Redis so captions don't each query Neo4j
+RULES_CACHE_TTL = 60  # seconds
+
+# A caption identical to the camera's last successfully checked one within this
+# window is not rechecked. Captions arrive once per camera caption_interval
+# (15-60 s, see cameras.py), so the window must outlast the longest interval
+CAPTION_DEDUP_TTL = 90  # seconds
+
+# Bumped by invalidate_rules_cache; part of the caption dedup stamp so a rule
+# change forces unchanged scenes to be checked again
+RULES_VERSION_KEY = "rules:version"
+
+# Words ignored when extracting rule keywords for the fallback matcher
+COMMON_WORDS = frozenset({
+    "detect", "anomaly", "rule", "the", "a", "an", "at", "in", "on", "for", "to",
+    "of", "and", "or", "is", "are", "was", "were"
+})
+
+# Rule embeddings kept in process (LRU); edited rules leave their old text behind
+RULE_EMBEDDING_CACHE_MAX_ENTRIES = 1024
+
+# Stacked rule-embedding matrices kept per distinct rule list
+RULE_MATRIX_CACHE_MAX_ENTRIES = 256
+
+# Fixed instructions sent as the system message so the prompt prefix is
+# byte-identical across calls and Ollama can reuse its KV cache for it
+SIMILARITY_SYSTEM_PROMPT = """You are an anomaly detection system. You are given an anomaly rule description and a camera caption. Determine if they describe the same or semantically similar scene/activity.
+
+Consider:
+- Synonyms (e.g., "person" vs "woman" vs "man", "sofa" vs "couch" vs "settee")
+- Similar actions (e.g., "sitting" vs "seated")
+- Same context but different wording
+
+Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do not include any explanation."""
+
+BATCH_SYSTEM_PROMPT = """You are an anomaly detection system. You are given numbered anomaly rules and a camera caption. For each rule, determine if the camera caption describes the same or similar scene/activity.
+
+Consider:
+- Synonyms (e.g., "person" vs "woman" vs "man", "sofa" vs "couch" vs "settee")
+- Similar actions (e.g., "sitting" vs "seated")
+- Same context but different wording
+
+Respond with ONLY a JSON object of the form {"matches": [true, false, ...]} containing one boolean per rule, in order. Do not include any explanation."""
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def _parse_timestamp(ts: str) -> datetime:
+    """Parse an ISO timestamp (trailing Z allowed), falling back to dateutil"""
+    try:
+        if ts.endswith('Z'):
+            return datetime.fromisoformat(ts[:-1] + '+00:00')
+        return datetime.fromisoformat(ts)
+    except ValueError:
+        return _dateutil_parser.isoparse(ts)
+
+
+def _tokenize(text: str) -> frozenset:
+    """Lower-cased word set of text (punctuation dropped)"""
+    return frozenset(_WORD.findall(text.lower()))
+
 
 class AnomalyDetectionService:
     """Service for detecting anomalies by comparing captions with rules using semantic similarity"""
@@ -29,13 +102,26 @@ class AnomalyDetectionService:
         self.similarity_threshold = 0.75  # Semantic similarity threshold (cosine similarity)
         self.ollama_base_url = settings.OLLAMA_BASE_URL
         self.ollama_model = settings.OLLAMA_MODEL
+        self.embedding_model = settings.OLLAMA_EMBEDDING_MODEL
+        # Rules are checked concurrently; set OLLAMA_NUM_PARALLEL on the Ollama
+        # server to at least the typical rule count so requests aren't queued
+        self._ollama = ollama.AsyncClient(host=self.ollama_base_url)
+        # Unit-length rule embeddings keyed by rule text (a changed rule gets a new entry)
+        self._rule_emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Contiguous float32 (N, D) matrices for the rule lists seen, keyed by their texts
+        self._rule_matrix_cache: Dict[Tuple[str, ...], np.ndarray] = {}
+        # similarity key -> (verdict, expires_at)
+        self._similarity_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # In-flight checks started by the caption listener
+        self._listener_tasks: set = set()
     
     async def check_caption_for_anomalies(
         self,
         camera_id: str,
         caption: str,
         timestamp: str,
-        confidence: float = 0.0
+        confidence: float = 0.0,
+        dedup: bool = True
     ) -> Optional[Dict[str, Any]]:
         """
         Check if a caption matches any anomaly rules for the camera
@@ -45,57 +131,198 @@ class AnomalyDetectionService:
             caption: Caption text to check
             timestamp: Timestamp of the caption
             confidence: AI confidence score
+            dedup: Skip the check if this caption repeats the camera's last
+                successfully checked one (False for explicit, manual checks)
             
         Returns:
             Dict with anomaly details if match found, None otherwise
         """
         try:
-            logger.info(f"🔍 Checking caption for anomalies: camera={camera_id}")
+            logger.info("🔍 Checking caption for anomalies: camera=%s", camera_id)
+            
+            caption_stamp = None
+            if dedup:
+                is_repeat, caption_stamp = await self._is_repeat_caption(camera_id, caption)
+                if is_repeat:
+                    logger.debug("Caption unchanged for camera %s, skipping rule checks", camera_id)
+                    return None
             
             # Get enabled anomaly rules for this camera
             rules = await self._get_anomaly_rules_for_camera(camera_id)
             
             if not rules:
-                logger.debug(f"No enabled rules found for camera {camera_id}")
+                logger.debug("No enabled rules found for camera %s", camera_id)
                 return None
             
-            # Check each rule for similarity
-            for rule in rules:
-                is_match = await self._check_rule_similarity(rule, caption)
-                
-                if is_match:
-                    logger.warning(f"⚠️ Anomaly detected! Rule: {rule.get('name')}, Camera: {camera_id}")
-                    
-                    anomaly_data = {
-                        "anomaly_id": f"anom_{uuid.uuid4().hex[:10]}",
-                        "rule_id": rule.get("id"),
-                        "rule_name": rule.get("name"),
-                        "rule_type": rule.get("rule_type"),
-                        "severity": rule.get("severity", "medium"),
-                        "camera_id": camera_id,
-                        "caption": caption,
-                        "timestamp": timestamp,
-                        "confidence": confidence,
-                        "description": rule.get("description", caption)
-                    }
-                    
-                    # Store anomaly in Neo4j for history
-                    await self._store_anomaly_in_neo4j(anomaly_data)
-                    
-                    # Send alert via WebSocket
-                    await self._send_alert(anomaly_data)
-                    
-                    # Deliver via configured channels (e.g., Twilio SMS)
-                    await notification_service.deliver_alerts(anomaly_data)
-                    
-                    return anomaly_data
+            # Find the highest-priority rule the caption matches
+            rule, settled = await self._first_matching_rule(rules, caption)
             
-            return None
+            # Only a check that got a real verdict for every rule may suppress repeats
+            if settled and caption_stamp:
+                await self._remember_caption(camera_id, caption_stamp)
+            
+            if rule is None:
+                return None
+            
+            logger.warning("⚠️ Anomaly detected! Rule: %s, Camera: %s", rule.get('name'), camera_id)
+            
+            anomaly_data = {
+                "anomaly_id": f"anom_{secrets.token_urlsafe(8)}",
+                "rule_id": rule.get("id"),
+                "rule_name": rule.get("name"),
+                "rule_type": rule.get("rule_type"),
+                "severity": rule.get("severity", "medium"),
+                "camera_id": camera_id,
+                "caption": caption,
+                "timestamp": timestamp,
+                "confidence": confidence,
+                "description": rule.get("description", caption)
+            }
+            
+            # Store in Neo4j for history, push over WebSocket and deliver via
+            # configured channels (e.g., Twilio SMS) - independent, so overlapped
+            results = await asyncio.gather(
+                self._store_anomaly_in_neo4j(anomaly_data),
+                self._send_alert(anomaly_data),
+                notification_service.deliver_alerts(anomaly_data),
+                return_exceptions=True
+            )
+            for step, result in zip(("store", "alert", "notify"), results):
+                if isinstance(result, Exception):
+                    logger.error("❌ Anomaly %s step failed: %s", step, result, exc_info=result)
+            
+            return anomaly_data
             
         except Exception as e:
-            logger.error(f"❌ Error checking caption for anomalies: {e}", exc_info=True)
+            logger.error("❌ Error checking caption for anomalies: %s", e, exc_info=True)
             return None
     
+    async def _is_repeat_caption(self, camera_id: str, caption: str) -> Tuple[bool, Optional[str]]:
+        """
+        Tell if the caption repeats the camera's last successfully checked one
+        
+        Static scenes yield the same caption frame after frame. The stamp
+        compared is the rules version plus a digest of the caption, so editing
+        rules (invalidate_rules_cache) makes unchanged scenes count as new.
+        
+        Args:
+            camera_id: Camera identifier
+            caption: Caption text
+            
+        Returns:
+            (is_repeat, stamp to pass to _remember_caption once the check
+            succeeds; None if Redis is unavailable)
+        """
+        digest = hashlib.blake2b(caption.strip().lower().encode("utf-8"), digest_size=8).hexdigest()
+        try:
+            version, previous = await redis_client.client.mget(RULES_VERSION_KEY, f"lastcap:{camera_id}")
+        except Exception as e:
+            logger.debug("Caption dedup lookup failed: %s", e)
+            return False, None
+        
+        stamp = f"{int(version or 0)}:{digest}"
+        return previous is not None and previous.decode() == stamp, stamp
+    
+    async def _remember_caption(self, camera_id: str, stamp: str):
+        """Record a successfully checked caption stamp for the camera"""
+        try:
+            await redis_client.client.set(f"lastcap:{camera_id}", stamp, ex=CAPTION_DEDUP_TTL)
+        except Exception as e:
+            logger.debug("Caption dedup write failed: %s", e)
+    
+    async def _first_matching_rule(
+        self,
+        rules: List[Dict[str, Any]],
+        caption: str
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Return the first rule the caption matches, in priority order
+        
+        Rules are matched by embedding cosine similarity. If embeddings are
+        unavailable, rules that opted out of always_check and share no
+        keywords with the caption are dropped, and the rest are asked about
+        in one Ollama chat call; if that answer can't be parsed, they are
+        checked individually (concurrently).
+        
+        Args:
+            rules: Rules ordered by priority (highest first)
+            caption: Caption text to check
+            
+        Returns:
+            (matching rule or None, whether every verdict is reliable - the
+            individual fallback turns Ollama errors into misses, so it isn't)
+        """
+        rule_texts = [self._build_rule_text(rule) for rule in rules]
+        keys = [self._similarity_key(caption, text) for text in rule_texts]
+        verdicts = await self._get_cached_similarities(keys)
+        
+        # Rules without text can never match
+        for i, text in enumerate(rule_texts):
+            if not text:
+                verdicts[i] = False
+        
+        pending = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        matches = []
+        if pending:
+            matches = await self._check_rules_by_embedding(caption, [rules[i] for i in pending])
+        
+        if matches is None:
+            # Only the LLM paths are left; spare them rules that can't plausibly match
+            caption_tokens = _tokenize(caption)
+            for i in pending:
+                if not self._may_match(rules[i], caption, caption_tokens):
+                    verdicts[i] = False
+            pending = [i for i, verdict in enumerate(verdicts) if verdict is None]
+            matches = await self._check_rules_batched(caption, [rules[i] for i in pending]) if pending else []
+        
+        if matches is not None:
+            for i, is_match in zip(pending, matches):
+                verdicts[i] = is_match
+            await self._set_cached_similarities({keys[i]: verdicts[i] for i in pending})
+            
+            for rule, is_match in zip(rules, verdicts):
+                if is_match:
+                    logger.info("✅ Semantic match found: rule='%s', caption='%.50s...'", rule.get('name', ''), caption)
+                    return rule, True
+            return None, True
+        
+        # Rules already settled (cached or prefiltered) keep their verdict
+        tasks = [
+            asyncio.create_task(self._check_rule_similarity(rule, caption))
+            if verdict is None else None
+            for rule, verdict in zip(rules, verdicts)
+        ]
+        try:
+            for rule, verdict, task in zip(rules, verdicts, tasks):
+                if (await task) if task is not None else verdict:
+                    return rule, False
+            return None, False
+        finally:
+            # Lower-priority checks still running are no longer needed
+            for task in tasks:
+                if task is not None:
+                    task.cancel()
+    
+    def _may_match(self, rule: Dict[str, Any], caption: str, caption_tokens: frozenset) -> bool:
+        """
+        Cheap prefilter: False only when the caption can't plausibly match the rule
+        
+        Args:
+            rule: Anomaly rule dictionary
+            caption: Caption text
+            caption_tokens: _tokenize(caption)
+            
+        Returns:
+            False if the rule shares no keywords (or object class) with the caption
+        """
+        keywords = rule.get("_keywords")
+        if rule.get("always_check") or not keywords:
+            return True
+        if not caption_tokens.isdisjoint(keywords):
+            return True
+        object_class = (rule.get("conditions") or {}).get("object_class")
+        return bool(object_class) and object_class.lower() in caption.lower()
+    
     async def _get_anomaly_rules_for_camera(self, camera_id: str) -> List[Dict[str, Any]]:
         """
         Get all enabled anomaly rules that apply to this camera
@@ -103,6 +330,17 @@ class AnomalyDetectionService:
         Returns:
             List of rule dictionaries
         """
+        cache_key = f"rules:camera:{camera_id}"
+        try:
+            cached = await redis_client.client.get(cache_key)
+            if cached:
+                rules = orjson.loads(cached)
+                for rule_data in rules:
+                    rule_data['_keywords'] = frozenset(rule_data.get('_keywords', ()))
+                return rules
+        except Exception as e:
+            logger.debug("Rules cache lookup failed: %s", e)
+        
         try:
             query = """
             MATCH (r:AnomalyRule)
@@ -112,7 +350,8 @@ class AnomalyDetectionService:
             WHERE c IS NOT NULL OR NOT EXISTS((r)-[:APPLIES_TO]->(:Camera))
             RETURN r.id as id, r.name as name, r.description as description,
                    r.rule_type as rule_type, r.severity as severity, 
-                   r.conditions as conditions, r.priority as priority
+                   r.conditions as conditions, r.priority as priority,
+                   coalesce(r.always_check, true) as always_check
             ORDER BY r.priority DESC
             """
             
@@ -125,19 +364,56 @@ class AnomalyDetectionService:
                 # Deserialize conditions from JSON string
                 if 'conditions' in rule_data and isinstance(rule_data['conditions'], str):
                     try:
-                        rule_data['conditions'] = json.loads(rule_data['conditions'])
-                    except (json.JSONDecodeError, TypeError):
+                        rule_data['conditions'] = orjson.loads(rule_data['conditions'])
+                    except (orjson.JSONDecodeError, TypeError):
                         rule_data['conditions'] = {}
                 
+                # Keywords for the prefilter and fallback matcher, extracted once per load
+                rule_data['_keywords'] = frozenset(
+                    w for w in _tokenize(rule_data.get('description') or '')
+                    if w not in COMMON_WORDS and len(w) > 3
+                )
+                
                 rules.append(rule_data)
             
-            logger.debug(f"Found {len(rules)} enabled rules for camera {camera_id}")
+            logger.debug("Found %s enabled rules for camera %s", len(rules), camera_id)
+            
+            try:
+                await redis_client.client.setex(
+                    cache_key,
+                    RULES_CACHE_TTL,
+                    orjson.dumps(rules, default=sorted)  # frozensets as lists
+                )
+            except Exception as e:
+                logger.debug("Rules cache write failed: %s", e)
+            
             return rules
             
         except Exception as e:
-            logger.error(f"Error fetching anomaly rules: {e}", exc_info=True)
+            logger.error("Error fetching anomaly rules: %s", e, exc_info=True)
             return []
     
+    async def invalidate_rules_cache(self, camera_id: Optional[str] = None):
+        """
+        Drop cached rules after a rule changes
+        
+        Args:
+            camera_id: Only this camera's entry; all cameras if None (rules
+                without APPLIES_TO links apply everywhere)
+        """
+        try:
+            await redis_client.client.incr(RULES_VERSION_KEY)
+            
+            if camera_id:
+                await redis_client.client.delete(f"rules:camera:{camera_id}")
+                return
+            
+            keys = [key async for key in redis_client.client.scan_iter(match="rules:camera:*", count=100)]
+            if keys:
+                await redis_client.client.delete(*keys)
+        except Exception as e:
+            logger.warning("Failed to invalidate rules cache: %s", e)
+    
     async def _check_rule_similarity(self, rule: Dict[str, Any], caption: str) -> bool:
         """
         Check if caption matches the rule conditions using Ollama LLM for semantic similarity
@@ -150,49 +426,236 @@ class AnomalyDetectionService:
             True if caption matches rule, False otherwise
         """
         try:
-            conditions = rule.get("conditions", {})
             rule_name = rule.get("name", "")
-            
-            # Build rule text for semantic comparison
-            # Combine rule name, description, and conditions into a meaningful text
-            rule_text_parts = []
-            
-            # Add rule name if available
-            if rule_name:
-                rule_text_parts.append(rule_name)
-            
-            # Add rule description
-            rule_description = rule.get("description", "")
-            if rule_description:
-                rule_text_parts.append(rule_description)
-            
-            # Add object_class from conditions if available
-            object_class = conditions.get("object_class")
-            if object_class:
-                rule_text_parts.append(f"object: {object_class}")
-            
-            # Combine into rule text
-            rule_text = " ".join(rule_text_parts)
+            rule_text = self._build_rule_text(rule)
             
             if not rule_text:
-                logger.warning(f"Rule {rule.get('id')} has no text for comparison")
+                logger.warning("Rule %s has no text for comparison", rule.get('id'))
                 return False
             
             # Use Ollama LLM to check semantic similarity
             is_similar = await self._check_similarity_with_ollama(caption, rule_text)
             
             if is_similar:
-                logger.info(f"✅ Semantic match found: rule='{rule_name}', caption='{caption[:50]}...'")
+                logger.info("✅ Semantic match found: rule='%s', caption='%.50s...'", rule_name, caption)
                 return True
             else:
-                logger.debug(f"No match: rule='{rule_name}', caption='{caption[:50]}...'")
+                logger.debug("No match: rule='%s', caption='%.50s...'", rule_name, caption)
                 return False
             
         except Exception as e:
-            logger.error(f"Error checking rule similarity: {e}", exc_info=True)
+            logger.error("Error checking rule similarity: %s", e, exc_info=True)
             # Fallback to simple keyword matching if Ollama fails
             return await self._fallback_keyword_match(rule, caption)
     
+    def _build_rule_text(self, rule: Dict[str, Any]) -> str:
+        """
+        Build rule text for semantic comparison
+        
+        Combines rule name, description, and conditions into a meaningful text
+        """
+        conditions = rule.get("conditions", {})
+        rule_text_parts = []
+        
+        # Add rule name if available
+        rule_name = rule.get("name", "")
+        if rule_name:
+            rule_text_parts.append(rule_name)
+        
+        # Add rule description
+        rule_description = rule.get("description", "")
+        if rule_description:
+            rule_text_parts.append(rule_description)
+        
+        # Add object_class from conditions if available
+        object_class = conditions.get("object_class")
+        if object_class:
+            rule_text_parts.append(f"object: {object_class}")
+        
+        # Combine into rule text
+        return " ".join(rule_text_parts)
+    
+    async def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with one Ollama /api/embed call
+        
+        Returns:
+            (len(texts), D) float32 matrix of unit-length rows
+        """
+        response = await self._ollama.embed(model=self.embedding_model, input=texts)
+        vectors = np.asarray(response["embeddings"], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.ascontiguousarray(vectors / np.maximum(norms, 1e-12), dtype=np.float32)
+    
+    async def _check_rules_by_embedding(
+        self,
+        caption: str,
+        rules: List[Dict[str, Any]]
+    ) -> Optional[List[bool]]:
+        """
+        Match rules by cosine similarity between caption and rule embeddings
+        
+        Args:
+            caption: Caption text from camera
+            rules: Anomaly rule dictionaries
+            
+        Returns:
+            One boolean per rule, or None if embeddings are unavailable
+        """
+        try:
+            rule_texts = [self._build_rule_text(rule) for rule in rules]
+            
+            # Rule embeddings are computed once; the caption rides along in the same call.
+            # Hits are taken up front so eviction during the await can't drop them
+            embeddings: Dict[str, np.ndarray] = {}
+            missing = []
+            for text in dict.fromkeys(rule_texts):
+                vector = self._rule_emb_cache.get(text)
+                if vector is None:
+                    missing.append(text)
+                else:
+                    self._rule_emb_cache.move_to_end(text)
+                    embeddings[text] = vector
+            
+            vectors = await self._embed_texts([caption] + missing)
+            for text, vector in zip(missing, vectors[1:]):
+                embeddings[text] = vector
+                self._remember_rule_embedding(text, vector)
+            
+            sims = self._rule_matrix(rule_texts, embeddings) @ vectors[0]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Rule similarities: %s", np.round(sims, 3).tolist())
+            
+            return (sims >= self.similarity_threshold).tolist()
+            
+        except Exception as e:
+            logger.warning("Embedding rule check failed (%s), falling back to LLM comparison", e)
+            return None
+    
+    def _remember_rule_embedding(self, text: str, vector: np.ndarray):
+        """Store a rule embedding in the in-process LRU"""
+        self._rule_emb_cache[text] = vector
+        self._rule_emb_cache.move_to_end(text)
+        if len(self._rule_emb_cache) > RULE_EMBEDDING_CACHE_MAX_ENTRIES:
+            self._rule_emb_cache.popitem(last=False)
+    
+    def _rule_matrix(self, rule_texts: List[str], embeddings: Dict[str, np.ndarray]) -> np.ndarray:
+        """Stacked rule embeddings for these rules, built once per rule list"""
+        key = tuple(rule_texts)
+        matrix = self._rule_matrix_cache.get(key)
+        if matrix is None:
+            matrix = np.ascontiguousarray(
+                np.stack([embeddings[text] for text in rule_texts]),
+                dtype=np.float32
+            )
+            if len(self._rule_matrix_cache) >= RULE_MATRIX_CACHE_MAX_ENTRIES:
+                self._rule_matrix_cache.clear()
+            self._rule_matrix_cache[key] = matrix
+        return matrix
+    
+    async def _check_rules_batched(
+        self,
+        caption: str,
+        rules: List[Dict[str, Any]]
+    ) -> Optional[List[bool]]:
+        """
+        Ask Ollama about every rule in a single call
+        
+        Args:
+            caption: Caption text from camera
+            rules: Anomaly rule dictionaries
+            
+        Returns:
+            One boolean per rule, or None if the response couldn't be used
+        """
+        try:
+            rule_lines = "\n".join(
+                f'Rule {i}: "{self._build_rule_text(rule)}"'
+                for i, rule in enumerate(rules, start=1)
+            )
+            
+            response = await self._ollama.chat(
+                model=self.ollama_model,
+                messages=[
+                    {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": f'{rule_lines}\n\nCamera Caption: "{caption}"\n\nAnswer with exactly {len(rules)} booleans.'},
+                ],
+                format="json",
+                options={
+                    "temperature": 0.0,
+                    "num_predict": 16 + 8 * len(rules),  # Room for the JSON array only
+                }
+            )
+            
+            matches = orjson.loads(response['message']['content']).get("matches")
+            if not isinstance(matches, list) or len(matches) != len(rules):
+                logger.warning("Batched rule check returned a malformed answer, checking rules individually")
+                return None
+            
+            return [m is True or str(m).strip().upper() in ("YES", "TRUE") for m in matches]
+            
+        except Exception as e:
+            logger.warning("Batched rule check failed (%s), checking rules individually", e)
+            return None
+    
+    def _similarity_key(self, caption: str, rule_text: str) -> str:
+        """Cache key for a (caption, rule text) pair"""
+        normalized = f"{caption.strip().lower()}|{rule_text}"
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    
+    async def _get_cached_similarities(self, keys: List[str]) -> List[Optional[bool]]:
+        """
+        Look up cached verdicts, in process first and then in Redis
+        
+        Returns:
+            One verdict per key, None where nothing is cached
+        """
+        now = time.monotonic()
+        verdicts: List[Optional[bool]] = []
+        for key in keys:
+            entry = self._similarity_cache.get(key)
+            if entry is not None and entry[1] > now:
+                self._similarity_cache.move_to_end(key)
+                verdicts.append(entry[0])
+            else:
+                verdicts.append(None)
+        
+        missing = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if missing:
+            try:
+                values = await redis_client.client.mget([f"simcache:{keys[i]}" for i in missing])
+                for i, value in zip(missing, values):
+                    if value is not None:
+                        verdicts[i] = value in (b"1", "1")
+                        self._remember_similarity(keys[i], verdicts[i])
+            except Exception as e:
+                logger.debug("Similarity cache lookup in Redis failed: %s", e)
+        
+        return verdicts
+    
+    async def _set_cached_similarities(self, verdicts: Dict[str, bool]):
+        """Cache Ollama verdicts in process and in Redis"""
+        if not verdicts:
+            return
+        
+        for key, verdict in verdicts.items():
+            self._remember_similarity(key, verdict)
+        
+        try:
+            pipe = redis_client.client.pipeline(transaction=False)
+            for key, verdict in verdicts.items():
+                pipe.setex(f"simcache:{key}", SIMILARITY_CACHE_TTL, "1" if verdict else "0")
+            await pipe.execute()
+        except Exception as e:
+            logger.debug("Similarity cache write to Redis failed: %s", e)
+    
+    def _remember_similarity(self, key: str, verdict: bool):
+        """Store a verdict in the in-process LRU"""
+        self._similarity_cache[key] = (verdict, time.monotonic() + SIMILARITY_CACHE_TTL)
+        self._similarity_cache.move_to_end(key)
+        if len(self._similarity_cache) > SIMILARITY_CACHE_MAX_ENTRIES:
+            self._similarity_cache.popitem(last=False)
+    
     async def _check_similarity_with_ollama(self, caption: str, rule_text: str) -> bool:
         """
         Use Ollama LLM to determine if caption and rule text are semantically similar
@@ -205,42 +668,38 @@ class AnomalyDetectionService:
             True if similar, False otherwise
         """
         try:
-            # Create a prompt for Ollama to compare the two texts
-            prompt = f"""You are an anomaly detection system. Compare the following two descriptions and determine if they describe the same or similar scene/activity.
-
-Anomaly Rule Description: "{rule_text}"
-
-Camera Caption: "{caption}"
-
-Are these describing the same or semantically similar scene/activity? Consider:
-- Synonyms (e.g., "person" vs "woman" vs "man", "sofa" vs "couch" vs "settee")
-- Similar actions (e.g., "sitting" vs "seated")
-- Same context but different wording
-
-Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do not include any explanation."""
-
-            # Call Ollama
-            response = ollama.generate(
+            key = self._similarity_key(caption, rule_text)
+            cached = (await self._get_cached_similarities([key]))[0]
+            if cached is not None:
+                return cached
+            
+            # Only the user message varies; the system prompt prefix is reused
+            response = await self._ollama.chat(
                 model=self.ollama_model,
-                prompt=prompt,
+                messages=[
+                    {"role": "system", "content": SIMILARITY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f'Rule: "{rule_text}"\nCaption: "{caption}"\nAnswer YES or NO.'},
+                ],
                 options={
-                    "temperature": 0.1,  # Low temperature for consistent results
-                    "num_predict": 10,  # Short response (just YES or NO)
+                    "temperature": 0.0,  # Deterministic verdicts
+                    "num_predict": 3,  # Just YES or NO
                 }
             )
             
-            if response and 'response' in response:
-                answer = response['response'].strip().upper()
+            content = (response or {}).get('message', {}).get('content')
+            if content is not None:
+                answer = content.strip().upper()
                 is_similar = answer.startswith('YES')
                 
-                logger.debug(f"Ollama response: {answer}, Similar: {is_similar}")
+                logger.debug("Ollama response: %s, Similar: %s", answer, is_similar)
+                await self._set_cached_similarities({key: is_similar})
                 return is_similar
             else:
-                logger.warning("Ollama response missing 'response' field, falling back to keyword matching")
+                logger.warning("Ollama response missing message content, falling back to keyword matching")
                 return False
                 
         except Exception as e:
-            logger.error(f"Error checking similarity with Ollama: {e}", exc_info=True)
+            logger.error("Error checking similarity with Ollama: %s", e, exc_info=True)
             return False
     
     async def _fallback_keyword_match(self, rule: Dict[str, Any], caption: str) -> bool:
@@ -263,23 +722,22 @@ Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do
                 if object_class.lower() in caption.lower():
                     return True
             
-            # Check for keywords in description
-            rule_description = rule.get("description", "").lower()
-            caption_lower = caption.lower()
-            
-            # Extract meaningful words
-            words = rule_description.split()
-            common_words = {"detect", "anomaly", "rule", "the", "a", "an", "at", "in", "on", "for", "to", "of", "and", "or", "is", "are", "was", "were"}
-            keywords = [w for w in words if w not in common_words and len(w) > 3]
+            # Check for description keywords (precomputed when rules are loaded)
+            keywords = rule.get("_keywords")
+            if keywords is None:
+                keywords = frozenset(
+                    w for w in _tokenize(rule.get("description") or "")
+                    if w not in COMMON_WORDS and len(w) > 3
+                )
             
-            matches = sum(1 for kw in keywords if kw in caption_lower)
+            matches = len(keywords & _tokenize(caption))
             if matches > 0 and matches / max(len(keywords), 1) >= 0.5:
                 return True
             
             return False
             
         except Exception as e:
-            logger.error(f"Error in fallback keyword match: {e}", exc_info=True)
+            logger.error("Error in fallback keyword match: %s", e, exc_info=True)
             return False
     
     async def _store_anomaly_in_neo4j(self, anomaly_data: Dict[str, Any]):
@@ -303,46 +761,22 @@ Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do
             # Parse timestamp
             try:
                 if isinstance(timestamp_str, str):
-                    # Try parsing ISO format timestamp
-                    try:
-                        detected_at_dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                        detected_at_iso = detected_at_dt.isoformat()
-                    except:
-                        # Fallback to dateutil parser
-                        from dateutil import parser
-                        detected_at_dt = parser.isoparse(timestamp_str)
-                        detected_at_iso = detected_at_dt.isoformat()
+                    detected_at_iso = _parse_timestamp(timestamp_str).isoformat()
                 else:
                     detected_at_iso = datetime.now().isoformat()
             except Exception as parse_error:
-                logger.warning(f"Failed to parse timestamp {timestamp_str}, using current time: {parse_error}")
+                logger.warning("Failed to parse timestamp %s, using current time: %s", timestamp_str, parse_error)
                 detected_at_iso = datetime.now().isoformat()
             
             # Create Event node first (or find existing one)
-            event_id = f"evt_{uuid.uuid4().hex[:12]}"
-            
-            # Create Event and Anomaly in one transaction
-            # First ensure camera exists and get its details
-            camera_check_query = """
-            MATCH (c:Camera {id: $camera_id})
-            RETURN c.id as id, c.name as name, c.location as location
-            """
-            
-            camera_result = await neo4j_client.async_execute_query(camera_check_query, {"camera_id": camera_id})
+            event_id = f"evt_{secrets.token_urlsafe(9)}"
             
-            if not camera_result:
-                logger.warning(f"Camera {camera_id} not found in Neo4j, creating basic camera node")
-                # Create basic camera if it doesn't exist
-                camera_create_query = """
-                MERGE (c:Camera {id: $camera_id})
-                ON CREATE SET c.name = $camera_id, c.location = 'Unknown', c.status = 'active'
-                RETURN c.id as id, c.name as name, c.location as location
-                """
-                camera_result = await neo4j_client.async_execute_query(camera_create_query, {"camera_id": camera_id})
-            
-            # Create Event and Anomaly
+            # Create Event and Anomaly in one transaction, creating a basic
+            # camera node first if the camera isn't in Neo4j
             create_query = """
-            MATCH (c:Camera {id: $camera_id})
+            MERGE (c:Camera {id: $camera_id})
+            ON CREATE SET c.name = $camera_id, c.location = 'Unknown', c.status = 'active'
+            WITH c
             
             // Create Event node
             CREATE (e:Event {
@@ -395,12 +829,13 @@ Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do
             })
             
             if result:
-                logger.info(f"✅ Stored anomaly in Neo4j: {anomaly_id} for camera {camera_id}")
+                await redis_client.bump_event_data_version()
+                logger.info("✅ Stored anomaly in Neo4j: %s for camera %s", anomaly_id, camera_id)
             else:
-                logger.warning(f"⚠️ Failed to store anomaly in Neo4j: {anomaly_id}")
+                logger.warning("⚠️ Failed to store anomaly in Neo4j: %s", anomaly_id)
                 
         except Exception as e:
-            logger.error(f"❌ Error storing anomaly in Neo4j: {e}", exc_info=True)
+            logger.error("❌ Error storing anomaly in Neo4j: %s", e, exc_info=True)
     
     async def _send_alert(self, anomaly_data: Dict[str, Any]):
         """
@@ -426,10 +861,87 @@ Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do
             }
             
             await alerts_manager.send_alert(alert_message)
-            logger.info(f"✅ Alert sent via WebSocket: {anomaly_data.get('rule_name')}")
+            logger.info("✅ Alert sent via WebSocket: %s", anomaly_data.get('rule_name'))
             
         except Exception as e:
-            logger.error(f"❌ Error sending alert: {e}", exc_info=True)
+            logger.error("❌ Error sending alert: %s", e, exc_info=True)
+    
+    async def warmup(self):
+        """
+        Pay the cold-start costs before the first caption arrives
+        
+        Opens the async Neo4j driver and a Redis connection, loads the chat
+        and embedding models into Ollama and prefills the fixed system prompt
+        so its KV cache is warm. Failures are logged and otherwise ignored.
+        """
+        steps = {
+            "neo4j": neo4j_client.async_execute_query("RETURN 1", {}),
+            "redis": redis_client.ping(),
+            "ollama chat": self._ollama.chat(
+                model=self.ollama_model,
+                messages=[
+                    {"role": "system", "content": SIMILARITY_SYSTEM_PROMPT},
+                    {"role": "user", "content": 'Rule: "warmup"\nCaption: "warmup"\nAnswer YES or NO.'},
+                ],
+                options={"temperature": 0.0, "num_predict": 1}
+            ),
+            "ollama embed": self._ollama.embed(model=self.embedding_model, input=["warmup"]),
+        }
+        results = await asyncio.gather(*steps.values(), return_exceptions=True)
+        for name, result in zip(steps, results):
+            if isinstance(result, Exception):
+                logger.warning("⚠️ Anomaly detection warmup (%s) failed: %s", name, result)
+        logger.info("✅ Anomaly detection warmed up")
+    
+    async def run_caption_listener(self):
+        """
+        Check every new caption as it is published on caption_events:{camera_id}
+        
+        Runs for the lifetime of the application; reconnects if Redis drops.
+        """
+        while True:
+            pubsub = None
+            try:
+                if not redis_client.client:
+                    await redis_client.connect()
+                
+                pubsub = redis_client.client.pubsub()
+                await pubsub.psubscribe("caption_events:*")
+                logger.info("✅ Anomaly detection listening for new captions")
+                
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    
+                    try:
+                        event = orjson.loads(message["data"])
+                    except orjson.JSONDecodeError:
+                        logger.warning("Skipping malformed caption event")
+                        continue
+                    
+                    if not event.get("caption"):
+                        continue
+                    
+                    task = asyncio.create_task(self.check_caption_for_anomalies(
+                        event["camera_id"],
+                        event["caption"],
+                        event["timestamp"],
+                        event.get("confidence", 0.0)
+                    ))
+                    self._listener_tasks.add(task)
+                    task.add_done_callback(self._listener_tasks.discard)
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ Caption listener error: %s, reconnecting in 5s", e)
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
     
     async def check_latest_caption_for_camera(self, camera_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -442,63 +954,28 @@ Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do
             Dict with anomaly details if match found, None otherwise
         """
         try:
-            # Get latest caption from Redis
-            # We'll need to scan for the latest caption key
-            # Format: caption:{camera_id}:{timestamp}
-            
-            # Get all caption keys for this camera
-            pattern = f"caption:{camera_id}:*"
-            keys = []
-            
-            try:
-                # Use scan_iter to find all matching keys
-                cursor = 0
-                while True:
-                    cursor, batch_keys = await redis_client.client.scan(
-                        cursor=cursor,
-                        match=pattern,
-                        count=100
-                    )
-                    for key in batch_keys:
-                        keys.append(key.decode() if isinstance(key, bytes) else key)
-                    if cursor == 0:
-                        break
-            except Exception as e:
-                logger.error(f"Error scanning Redis keys: {e}")
-                return None
-            
-            if not keys:
-                logger.debug(f"No captions found in Redis for camera {camera_id}")
-                return None
-            
-            # Get the latest caption (by timestamp in key)
-            # Sort keys to get the latest
-            keys.sort(reverse=True)
-            latest_key = keys[0]
+            # Latest caption timestamp from the per-camera index
+            # Caption keys are caption:{camera_id}:{timestamp}
+            timestamp_str = await redis_client.get_latest_caption_timestamp(camera_id)
             
-            # Extract timestamp from key
-            # Format: caption:{camera_id}:{timestamp}
-            parts = latest_key.split(":")
-            if len(parts) < 3:
+            if not timestamp_str:
+                logger.debug("No captions found in Redis for camera %s", camera_id)
                 return None
             
-            timestamp_str = ":".join(parts[2:])  # Handle timestamps with colons
+            latest_key = f"caption:{camera_id}:{timestamp_str}"
+            metadata_key = f"meta:{camera_id}:{timestamp_str}"
             
-            # Get caption from Redis
-            caption = await redis_client.client.get(latest_key)
+            # Get caption and metadata (if available) in one round-trip
+            caption, metadata_json = await redis_client.client.mget(latest_key, metadata_key)
             if not caption:
                 return None
             
             caption_text = caption.decode() if isinstance(caption, bytes) else caption
-            
-            # Get metadata if available
-            metadata_key = f"meta:{camera_id}:{timestamp_str}"
-            metadata_json = await redis_client.client.get(metadata_key)
             confidence = 0.0
             
             if metadata_json:
                 try:
-                    metadata = json.loads(metadata_json.decode() if isinstance(metadata_json, bytes) else metadata_json)
+                    metadata = orjson.loads(metadata_json)
                     confidence = metadata.get("confidence", 0.0)
                 except:
                     pass
@@ -508,11 +985,12 @@ Respond with ONLY "YES" if they are similar, or "NO" if they are not similar. Do
                 camera_id,
                 caption_text,
                 timestamp_str,
-                confidence
+                confidence,
+                dedup=False
             )
             
         except Exception as e:
-            logger.error(f"Error checking latest caption: {e}", exc_info=True)
+            logger.error("Error checking latest caption: %s", e, exc_info=True)
             return None
 
 
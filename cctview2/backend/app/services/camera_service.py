@@ -5,28 +5,80 @@ Camera Service
 Handles camera CRUD operations and coordinates with stream_manager
 """
 
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import uuid
+import secrets
+import orjson
 
 from app.db.neo4j.client import neo4j_client
 from app.db.redis.client import redis_client
+from app.services.dashboard_service import DASHBOARD_STATS_CACHE_KEY
 
 logger = logging.getLogger(__name__)
 
+# Per-camera event counts are buffered in this Redis hash and written to
+# Neo4j in one query every EVENT_COUNT_FLUSH_INTERVAL seconds
+EVENT_COUNTS_KEY = "camera:events_today"
+EVENT_COUNT_FLUSH_INTERVAL = 5  # seconds
+
+# Status changes are buffered (latest per camera) and written together
+STATUS_FLUSH_INTERVAL = 0.5  # seconds
+
+# Read and clear the buffered counts atomically so no increment is lost
+_TAKE_EVENT_COUNTS = """
+local counts = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return counts
+"""
+
+# Cache-aside copies of camera nodes in Redis, dropped on every camera write
+CAMERAS_CACHE_KEY = "cameras:all"
+CAMERAS_CACHE_TTL = 60  # seconds
+CAMERA_CACHE_TTL = 300  # seconds
+
+
+# Fields update_camera may change; one fixed statement covers any subset
+UPDATABLE_CAMERA_FIELDS = ("name", "location", "description", "status")
+UPDATE_CAMERA_QUERY = """
+MATCH (c:Camera {id: $camera_id})
+SET c.name = coalesce($name, c.name),
+    c.location = coalesce($location, c.location),
+    c.description = coalesce($description, c.description),
+    c.status = coalesce($status, c.status)
+RETURN c
+"""
+
+def _camera_dict(node) -> Dict[str, Any]:
+    """Camera node properties with Neo4j temporal values as ISO strings"""
+    camera = dict(node)
+    for key, value in camera.items():
+        if hasattr(value, 'isoformat'):
+            camera[key] = value.isoformat()
+    return camera
+
 
 class CameraService:
     """Service for camera management operations"""
     
     def __init__(self):
+        # camera_id -> latest status not yet written to Neo4j
+        self._pending_status: Dict[str, str] = {}
         logger.info("📹 Camera Service initialized")
     
     async def get_all_cameras(self) -> List[Dict[str, Any]]:
         """
-        Get all cameras from Neo4j
+        Get all cameras (Redis cache, then Neo4j)
         """
         try:
+            try:
+                cached = await redis_client.client.get(CAMERAS_CACHE_KEY)
+                if cached:
+                    return orjson.loads(cached)
+            except Exception as e:
+                logger.debug(f"Cameras cache lookup failed: {e}")
+            
             query = """
             MATCH (c:Camera)
             RETURN c
@@ -37,9 +89,14 @@ class CameraService:
             
             cameras = []
             for record in result:
-                camera_data = dict(record['c'])
+                camera_data = _camera_dict(record['c'])
                 cameras.append(camera_data)
             
+            try:
+                await redis_client.client.setex(CAMERAS_CACHE_KEY, CAMERAS_CACHE_TTL, orjson.dumps(cameras))
+            except Exception as e:
+                logger.debug(f"Cameras cache write failed: {e}")
+            
             logger.info(f"Retrieved {len(cameras)} cameras")
             return cameras
             
@@ -49,21 +106,51 @@ class CameraService:
     
     async def get_camera_by_id(self, camera_id: str) -> Optional[Dict[str, Any]]:
         """
-        Get single camera by ID
+        Get single camera by ID (Redis cache, then Neo4j)
         """
+        cache_key = f"camera:{camera_id}"
         try:
+            try:
+                cached = await redis_client.client.get(cache_key)
+                if cached:
+                    return orjson.loads(cached)
+            except Exception as e:
+                logger.debug(f"Camera cache lookup failed: {e}")
+            
             camera = await neo4j_client.get_camera(camera_id)
             
             if not camera:
                 logger.warning(f"Camera not found: {camera_id}")
                 return None
             
+            camera = _camera_dict(camera)
+            try:
+                await redis_client.client.setex(cache_key, CAMERA_CACHE_TTL, orjson.dumps(camera))
+            except Exception as e:
+                logger.debug(f"Camera cache write failed: {e}")
+            
             return camera
             
         except Exception as e:
             logger.error(f"Error fetching camera {camera_id}: {e}")
             raise
     
+    async def invalidate_camera_cache(self, *camera_ids: str):
+        """
+        Drop the cached camera list, dashboard stats and the given cameras after a write
+        
+        Args:
+            camera_ids: Cameras whose cached entry is stale
+        """
+        try:
+            await redis_client.client.delete(
+                CAMERAS_CACHE_KEY,
+                DASHBOARD_STATS_CACHE_KEY,
+                *(f"camera:{camera_id}" for camera_id in camera_ids)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to invalidate camera cache: {e}")
+    
     async def create_camera(self, camera_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create new camera in Neo4j
@@ -76,7 +163,7 @@ class CameraService:
         """
         try:
             # Generate unique camera ID
-            camera_id = f"cam_{uuid.uuid4().hex[:8]}"
+            camera_id = f"cam_{secrets.token_hex(4)}"
             
             logger.info(f"Creating camera: {camera_data['name']} ({camera_id})")
             
@@ -97,7 +184,9 @@ class CameraService:
             }
             
             # Store in Neo4j using the client method
-            created_camera = await neo4j_client.create_camera(full_data)
+            created = await neo4j_client.create_cameras_bulk([full_data])
+            created_camera = _camera_dict(created[0])
+            await self.invalidate_camera_cache(camera_id)
             
             logger.info(f"✅ Camera created: {camera_id}")
             
@@ -116,42 +205,19 @@ class CameraService:
         Update camera configuration
         """
         try:
-            # Check if camera exists
-            existing = await self.get_camera_by_id(camera_id)
-            if not existing:
-                return None
-            
-            # Build update query
-            update_fields = []
+            # Always the same statement (absent fields keep their value), so
+            # Neo4j plans it once; no match means no row, so it doubles as
+            # the existence check
             params = {"camera_id": camera_id}
+            for field in UPDATABLE_CAMERA_FIELDS:
+                params[field] = update_data.get(field)
             
-            if "name" in update_data:
-                update_fields.append("c.name = $name")
-                params["name"] = update_data["name"]
-            
-            if "location" in update_data:
-                update_fields.append("c.location = $location")
-                params["location"] = update_data["location"]
-            
-            if "description" in update_data:
-                update_fields.append("c.description = $description")
-                params["description"] = update_data["description"]
-            
-            if "status" in update_data:
-                update_fields.append("c.status = $status")
-                params["status"] = update_data["status"]
-            
-            if not update_fields:
-                return existing
-            
-            query = f"""
-            MATCH (c:Camera {{id: $camera_id}})
-            SET {', '.join(update_fields)}
-            RETURN c
-            """
-            
-            result = await neo4j_client.async_execute_query(query, params)
-            updated_camera = dict(result[0]['c'])
+            result = await neo4j_client.async_execute_query(UPDATE_CAMERA_QUERY, params)
+            if not result:
+                logger.warning(f"Camera not found: {camera_id}")
+                return None
+            updated_camera = _camera_dict(result[0]['c'])
+            await self.invalidate_camera_cache(camera_id)
             
             logger.info(f"✅ Updated camera: {camera_id}")
             
@@ -166,21 +232,22 @@ class CameraService:
         Delete camera from Neo4j and clear Redis cache
         """
         try:
-            # Check if camera exists
-            existing = await self.get_camera_by_id(camera_id)
-            if not existing:
-                return False
-            
-            # Delete from Neo4j (will cascade delete relationships)
+            # Delete from Neo4j (will cascade delete relationships);
+            # deleted is 0 when the camera doesn't exist
             query = """
             MATCH (c:Camera {id: $camera_id})
             DETACH DELETE c
+            RETURN count(*) as deleted
             """
             
-            await neo4j_client.async_execute_query(query, {"camera_id": camera_id})
+            result = await neo4j_client.async_execute_query(query, {"camera_id": camera_id})
+            if not result or not result[0]['deleted']:
+                logger.warning(f"Camera not found: {camera_id}")
+                return False
             
             # Clear Redis cache
             await redis_client.clear_camera_cache(camera_id)
+            await self.invalidate_camera_cache(camera_id)
             
             logger.info(f"✅ Deleted camera: {camera_id}")
             
@@ -192,20 +259,54 @@ class CameraService:
     
     async def update_camera_status(self, camera_id: str, status: str):
         """
-        Update camera status
+        Update camera status (buffered, written by run_status_flusher)
+        
+        Only the latest status per camera is kept until the next flush.
+        """
+        self._pending_status[camera_id] = status
+        logger.debug(f"📊 Camera {camera_id} status: {status}")
+    
+    async def flush_status_updates(self):
+        """Write buffered camera statuses to Neo4j in one query"""
+        pending, self._pending_status = self._pending_status, {}
+        if not pending:
+            return
+        
+        query = """
+        UNWIND $rows AS r
+        MATCH (c:Camera {id: r.id})
+        SET c.status = r.status
         """
         try:
-            query = """
-            MATCH (c:Camera {id: $camera_id})
-            SET c.status = $status
-            """
             await neo4j_client.async_execute_query(query, {
-                "camera_id": camera_id,
-                "status": status
+                "rows": [{"id": camera_id, "status": status} for camera_id, status in pending.items()]
             })
-            logger.debug(f"📊 Camera {camera_id} status: {status}")
-        except Exception as e:
-            logger.error(f"Error updating camera status: {e}")
+        except Exception:
+            # Put them back unless a newer status arrived meanwhile
+            for camera_id, status in pending.items():
+                self._pending_status.setdefault(camera_id, status)
+            raise
+        
+        await self.invalidate_camera_cache(*pending)
+    
+    async def run_status_flusher(self):
+        """
+        Flush buffered camera statuses to Neo4j periodically
+        
+        Runs for the lifetime of the application; flushes once more on shutdown.
+        """
+        try:
+            while True:
+                await asyncio.sleep(STATUS_FLUSH_INTERVAL)
+                try:
+                    await self.flush_status_updates()
+                except Exception as e:
+                    logger.error(f"Error updating camera status: {e}")
+        finally:
+            try:
+                await self.flush_status_updates()
+            except Exception as e:
+                logger.error(f"Error updating camera status on shutdown: {e}")
     
     async def update_camera_properties(
         self,
@@ -217,26 +318,22 @@ class CameraService:
         Update camera stream properties (detected from stream)
         """
         try:
-            update_fields = []
-            params = {"camera_id": camera_id}
-            
-            if resolution:
-                update_fields.append("c.resolution = $resolution")
-                params["resolution"] = resolution
-            
-            if fps:
-                update_fields.append("c.fps = $fps")
-                params["fps"] = fps
-            
-            if not update_fields:
+            if not resolution and not fps:
                 return
             
-            query = f"""
-            MATCH (c:Camera {{id: $camera_id}})
-            SET {', '.join(update_fields)}
+            # Fixed statement; a missing value keeps the stored one
+            query = """
+            MATCH (c:Camera {id: $camera_id})
+            SET c.resolution = coalesce($resolution, c.resolution),
+                c.fps = coalesce($fps, c.fps)
             """
             
-            await neo4j_client.async_execute_query(query, params)
+            await neo4j_client.async_execute_query(query, {
+                "camera_id": camera_id,
+                "resolution": resolution or None,
+                "fps": fps or None
+            })
+            await self.invalidate_camera_cache(camera_id)
             logger.debug(f"📊 Updated camera properties: {camera_id}")
             
         except Exception as e:
@@ -244,49 +341,83 @@ class CameraService:
     
     async def increment_camera_events(self, camera_id: str):
         """
-        Increment today's event count
+        Increment today's event count (buffered in Redis, see flush_event_counts)
         """
         try:
-            query = """
-            MATCH (c:Camera {id: $camera_id})
-            SET c.eventsToday = COALESCE(c.eventsToday, 0) + 1
-            """
-            await neo4j_client.async_execute_query(query, {
-                "camera_id": camera_id
-            })
+            await redis_client.client.hincrby(EVENT_COUNTS_KEY, camera_id, 1)
         except Exception as e:
             logger.error(f"Error incrementing events: {e}")
     
+    async def flush_event_counts(self):
+        """
+        Add the event counts buffered in Redis to the cameras in Neo4j
+        
+        Counts are put back into the buffer if the Neo4j write fails.
+        """
+        raw = await redis_client.client.eval(_TAKE_EVENT_COUNTS, 1, EVENT_COUNTS_KEY)
+        if not raw:
+            return
+        
+        updates = [
+            {"id": raw[i].decode(), "delta": int(raw[i + 1])}
+            for i in range(0, len(raw), 2)
+        ]
+        
+        query = """
+        UNWIND $updates AS u
+        MATCH (c:Camera {id: u.id})
+        SET c.eventsToday = COALESCE(c.eventsToday, 0) + u.delta
+        """
+        try:
+            await neo4j_client.async_execute_query(query, {"updates": updates})
+        except Exception:
+            pipe = redis_client.client.pipeline(transaction=False)
+            for u in updates:
+                pipe.hincrby(EVENT_COUNTS_KEY, u["id"], u["delta"])
+            await pipe.execute()
+            raise
+        
+        await self.invalidate_camera_cache(*(u["id"] for u in updates))
+    
+    async def run_event_count_flusher(self):
+        """
+        Flush buffered event counts to Neo4j periodically
+        
+        Runs for the lifetime of the application; flushes once more on shutdown.
+        """
+        try:
+            while True:
+                await asyncio.sleep(EVENT_COUNT_FLUSH_INTERVAL)
+                try:
+                    await self.flush_event_counts()
+                except Exception as e:
+                    logger.error(f"Error flushing event counts: {e}")
+        finally:
+            try:
+                await self.flush_event_counts()
+            except Exception as e:
+                logger.error(f"Error flushing event counts on shutdown: {e}")
+    
     async def get_camera_statistics(self, camera_id: str) -> Dict[str, Any]:
         """
         Get camera statistics (events, uptime, etc.)
         """
         try:
+            # Only the fields the stats need, not the whole camera node
             query = """
             MATCH (c:Camera {id: $camera_id})
             OPTIONAL MATCH (c)-[:CAPTURED]->(e:Event)
             WHERE date(e.timestamp) = date()
-            RETURN c, count(e) as events_today
+            RETURN $camera_id as camera_id, c.status as status,
+                   count(e) as events_today, coalesce(c.uptime, '0%') as uptime,
+                   c.resolution as resolution, c.fps as fps
             """
             
             result = await neo4j_client.async_execute_query(query, {
                 "camera_id": camera_id
             })
             
-            if not result:
-                return {}
-            
-            camera_data = dict(result[0]['c'])
-            events_today = result[0]['events_today']
-            
-            return {
-                "camera_id": camera_id,
-                "status": camera_data.get("status"),
-                "events_today": events_today,
-                "uptime": camera_data.get("uptime", "0%"),
-                "resolution": camera_data.get("resolution"),
-                "fps": camera_data.get("fps")
-            }
+            return result[0] if result else {}
             
         except Exception as e:
             logger.error(f"Error fetching camera statistics: {e}")
@@ -5,16 +5,38 @@ Chat Service
 Business logic layer for RAG chatbot interactions
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 from datetime import datetime
-import uuid
+import secrets
+import orjson
 
 from app.rag.response_generator import ResponseGenerator
 from app.db.neo4j.client import neo4j_client
+from app.db.redis.client import redis_client
 
 logger = logging.getLogger(__name__)
 
+# Messages fetched per query while streaming a conversation export
+EXPORT_PAGE_SIZE = 200
+
+# Popular-query aggregations are cached in Redis for this long
+POPULAR_QUERIES_CACHE_TTL = 120  # seconds
+
+# Suggested queries shown when there's no context to tailor them to
+_DEFAULT_SUGGESTIONS = (
+    "What happened today at the main entrance?",
+    "Show me events from yesterday",
+    "Any unusual activity in the past hour?",
+    "What was happening at 5 PM?",
+    "Show me all deliveries this week",
+    "Were there any people detected in the parking lot?",
+    "What happened between 2 PM and 4 PM?",
+    "Show me activity from all cameras today"
+)
+_DEFAULT_SUGGESTIONS_TOP5 = _DEFAULT_SUGGESTIONS[:5]
+
 
 class ChatService:
     """Service for handling chat interactions"""
@@ -40,12 +62,12 @@ class ChatService:
         Returns:
             Complete chat response with answer and metadata
         """
+        # Generate or use existing session ID (also returned on error)
+        if not session_id:
+            session_id = f"session_{secrets.token_hex(6)}"
+        
         try:
-            logger.info(f"💬 Received message: {message[:100]}...")
-            
-            # Generate or use existing session ID
-            if not session_id:
-                session_id = f"session_{uuid.uuid4().hex[:12]}"
+            logger.info("💬 Received message: %.100s...", message)
             
             # Get conversation history for context
             conversation_history = await self.response_generator.get_conversation_history(
@@ -64,25 +86,25 @@ class ChatService:
             # Add session info
             response['session_id'] = session_id
             
-            logger.info(f"✅ Message processed successfully (session: {session_id})")
+            logger.info("✅ Message processed successfully (session: %s)", session_id)
             return response
             
         except Exception as e:
-            logger.error(f"❌ Error processing message: {e}")
-            import traceback
-            traceback.print_exc()
+            # Through logging (not stderr) so the stack goes to the configured handlers
+            logger.error("❌ Error processing message: %s", e, exc_info=True)
             
             return {
                 'success': False,
                 'error': str(e),
                 'answer': 'I apologize, but I encountered an error. Please try again.',
-                'session_id': session_id or f"session_{uuid.uuid4().hex[:12]}"
+                'session_id': session_id
             }
     
     async def get_session_history(
         self,
         session_id: str,
-        limit: int = 50
+        limit: int = 50,
+        after_query_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get conversation history for a session
@@ -90,53 +112,45 @@ class ChatService:
         Args:
             session_id: Session identifier
             limit: Maximum number of messages to return
+            after_query_id: Return only messages after this one, for paging
             
         Returns:
             List of messages with queries and responses
         """
         try:
+            # Rows come back in their final shape; timestamps are formatted
+            # (YYYY-MM-DD HH:MM:SS) by Neo4j rather than parsed per row here.
+            # Pages are keyed on (timestamp, id) so rows sharing a timestamp or
+            # written mid-export are neither repeated nor skipped
             query = """
+            OPTIONAL MATCH (last:QueryLog {session_id: $session_id, id: $after_query_id})
+            WITH last
             MATCH (q:QueryLog {session_id: $session_id})
+            WHERE $after_query_id IS NULL
+               OR q.timestamp > last.timestamp
+               OR (q.timestamp = last.timestamp AND q.id > last.id)
             RETURN 
                 q.id as query_id,
                 q.query_text as query,
-                q.timestamp as timestamp,
+                CASE WHEN q.timestamp IS NULL THEN 'Unknown' ELSE
+                    toString(date(q.timestamp)) + ' ' +
+                    right('0' + toString(q.timestamp.hour), 2) + ':' +
+                    right('0' + toString(q.timestamp.minute), 2) + ':' +
+                    right('0' + toString(q.timestamp.second), 2)
+                END as timestamp,
                 q.intent as intent,
-                q.event_count as event_count,
-                q.success as success
-            ORDER BY q.timestamp ASC
+                coalesce(q.event_count, 0) as event_count,
+                coalesce(q.success, false) as success
+            ORDER BY q.timestamp ASC, q.id ASC
             LIMIT $limit
             """
             
-            results = await neo4j_client.async_execute_query(query, {
+            history = await neo4j_client.async_execute_query(query, {
                 'session_id': session_id,
+                'after_query_id': after_query_id,
                 'limit': limit
             })
             
-            history = []
-            for record in results:
-                timestamp = record.get('timestamp')
-                if timestamp:
-                    try:
-                        if isinstance(timestamp, str):
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        else:
-                            dt = timestamp
-                        time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    except Exception:
-                        time_str = str(timestamp)
-                else:
-                    time_str = 'Unknown'
-                
-                history.append({
-                    'query_id': record.get('query_id'),
-                    'query': record.get('query'),
-                    'timestamp': time_str,
-                    'intent': record.get('intent'),
-                    'event_count': record.get('event_count', 0),
-                    'success': record.get('success', False)
-                })
-            
             logger.info(f"📜 Retrieved {len(history)} messages for session {session_id}")
             return history
             
@@ -157,20 +171,9 @@ class ChatService:
         Returns:
             List of suggested query strings
         """
-        default_suggestions = [
-            "What happened today at the main entrance?",
-            "Show me events from yesterday",
-            "Any unusual activity in the past hour?",
-            "What was happening at 5 PM?",
-            "Show me all deliveries this week",
-            "Were there any people detected in the parking lot?",
-            "What happened between 2 PM and 4 PM?",
-            "Show me activity from all cameras today"
-        ]
-        
         # If context provided, could use LLM to generate contextual suggestions
         # For now, return default suggestions
-        return default_suggestions[:5]
+        return list(_DEFAULT_SUGGESTIONS_TOP5)
     
     async def get_chat_statistics(
         self,
@@ -188,31 +191,15 @@ class ChatService:
             Statistics dictionary
         """
         try:
-            stats = await self.response_generator.get_query_analytics(
-                user_id=user_id,
-                days=days
-            )
+            if not user_id:
+                return await self.response_generator.get_query_analytics(days=days)
             
-            # Add additional statistics
-            if user_id:
-                # Get most active cameras
-                query = """
-                MATCH (u:User {id: $user_id})-[:ASKED]->(q:QueryLog)-[:REFERENCES]->(e:Event)<-[:CAPTURED]-(c:Camera)
-                WHERE q.timestamp >= datetime() - duration({days: $days})
-                RETURN c.name as camera, count(e) as events
-                ORDER BY events DESC
-                LIMIT 5
-                """
-                
-                camera_results = await neo4j_client.async_execute_query(query, {
-                    'user_id': user_id,
-                    'days': days
-                })
-                
-                stats['top_cameras'] = [
-                    {'camera': r.get('camera'), 'events': r.get('events')}
-                    for r in camera_results
-                ]
+            # Analytics and most active cameras are independent queries
+            stats, top_cameras = await asyncio.gather(
+                self.response_generator.get_query_analytics(user_id=user_id, days=days),
+                self._get_top_cameras(user_id, days)
+            )
+            stats['top_cameras'] = top_cameras
             
             return stats
             
@@ -220,6 +207,22 @@ class ChatService:
             logger.error(f"❌ Error getting chat statistics: {e}")
             return {}
     
+    async def _get_top_cameras(self, user_id: str, days: int) -> List[Dict[str, Any]]:
+        """Cameras whose events the user's recent queries referenced most"""
+        query = """
+        MATCH (u:User {id: $user_id})-[:ASKED]->(q:QueryLog)-[:REFERENCES]->(e:Event)<-[:CAPTURED]-(c:Camera)
+        WHERE q.timestamp >= datetime() - duration({days: $days})
+        RETURN c.name as camera, count(e) as events
+        ORDER BY events DESC
+        LIMIT 5
+        """
+        
+        # Rows are already {'camera', 'events'} dicts
+        return await neo4j_client.async_execute_query(query, {
+            'user_id': user_id,
+            'days': days
+        })
+    
     async def clear_session(self, session_id: str) -> bool:
         """
         Clear/delete a conversation session
@@ -265,30 +268,38 @@ class ChatService:
         Returns:
             List of popular queries with counts
         """
+        cache_key = f"chat:popular:{days}:{limit}"
         try:
+            try:
+                cached = await redis_client.client.get(cache_key)
+                if cached:
+                    return orjson.loads(cached)
+            except Exception as e:
+                logger.debug(f"Popular queries cache lookup failed: {e}")
+            
             query = """
             MATCH (q:QueryLog)
             WHERE q.timestamp >= datetime() - duration({days: $days})
-            WITH toLower(q.query_text) as query_lower, 
-                 q.query_text as original_query,
+            WITH coalesce(q.query_text_lower, toLower(q.query_text)) as query_lower,
+                 min(q.query_text) as original_query,
                  count(*) as query_count
-            RETURN original_query as query, query_count
+            RETURN original_query as query, query_count as count
             ORDER BY query_count DESC
             LIMIT $limit
             """
             
-            results = await neo4j_client.async_execute_query(query, {
+            # Grouped case-insensitively on query_text_lower (stored at log
+            # time; older logs fall back to toLower). Rows are already
+            # {'query', 'count'} dicts
+            popular_queries = await neo4j_client.async_execute_query(query, {
                 'days': days,
                 'limit': limit
             })
             
-            popular_queries = [
-                {
-                    'query': r.get('query'),
-                    'count': r.get('query_count', 0)
-                }
-                for r in results
-            ]
+            try:
+                await redis_client.client.setex(cache_key, POPULAR_QUERIES_CACHE_TTL, orjson.dumps(popular_queries))
+            except Exception as e:
+                logger.debug(f"Popular queries cache write failed: {e}")
             
             logger.info(f"📊 Retrieved {len(popular_queries)} popular queries")
             return popular_queries
@@ -300,35 +311,38 @@ class ChatService:
     async def export_conversation(
         self,
         session_id: str
-    ) -> Dict[str, Any]:
+    ) -> AsyncIterator[bytes]:
         """
-        Export conversation history in a structured format
+        Export conversation history as a JSON document, streamed page by page
         
         Args:
             session_id: Session identifier
             
-        Returns:
-            Structured conversation data
+        Yields:
+            Chunks of {"session_id", "exported_at", "messages": [...], "message_count"}
         """
-        try:
-            history = await self.get_session_history(session_id, limit=1000)
-            
-            export_data = {
-                'session_id': session_id,
-                'exported_at': datetime.now().isoformat(),
-                'message_count': len(history),
-                'messages': history
-            }
+        yield b'{"session_id":' + orjson.dumps(session_id) + \
+            b',"exported_at":' + orjson.dumps(datetime.now().isoformat()) + b',"messages":['
+        
+        count = 0
+        after_query_id = None
+        while True:
+            page = await self.get_session_history(
+                session_id, limit=EXPORT_PAGE_SIZE, after_query_id=after_query_id
+            )
+            if not page:
+                break
             
-            logger.info(f"📦 Exported conversation {session_id} with {len(history)} messages")
-            return export_data
+            chunk = b','.join(orjson.dumps(message) for message in page)
+            yield (b',' + chunk) if count else chunk
+            count += len(page)
+            after_query_id = page[-1]["query_id"]
             
-        except Exception as e:
-            logger.error(f"❌ Error exporting conversation: {e}")
-            return {
-                'error': str(e),
-                'session_id': session_id
-            }
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+        
+        yield b'],"message_count":' + str(count).encode() + b'}'
+        logger.info(f"📦 Exported conversation {session_id} with {count} messages")
 
 
 # Singleton instance
@@ -1,8 +1,10 @@
 # FILE LOCATION: backend/app/services/dashboard_service.py
 
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List
 import logging
+import orjson
 from neo4j.time import DateTime as Neo4jDateTime
 
 from app.db.neo4j.client import neo4j_client
@@ -10,252 +12,261 @@ from app.db.redis.client import redis_client
 
 logger = logging.getLogger(__name__)
 
+# Every browser polls the dashboard, so the panels are served from Redis for
+# a few seconds; recent activity expires sooner to keep the feed live
+DASHBOARD_STATS_CACHE_KEY = "dashboard:stats:v1"
+DASHBOARD_STATS_CACHE_TTL = 10  # seconds
+DASHBOARD_RECENT_CACHE_KEY = "dashboard:recent:v1"
+DASHBOARD_RECENT_CACHE_TTL = 2  # seconds
+
+# One round-trip for every dashboard counter; each CALL block is an independent
+# aggregation that always yields exactly one row, even on an empty graph.
+# Unfiltered totals come from the count store and filtered ones from index
+# seeks and range scans (see initialize_schema) instead of a CASE over every node
+DASHBOARD_STATS_QUERY = """
+CALL {
+    MATCH (c:Camera)
+    RETURN count(c) as cam_total
+}
+CALL {
+    MATCH (c:Camera)
+    WHERE c.is_active = true
+    RETURN count(c) as cam_active
+}
+CALL {
+    MATCH (c:Camera)
+    WHERE c.created_at < $yesterday
+    RETURN count(c) as cam_yesterday
+}
+CALL {
+    MATCH (e:Event)
+    RETURN count(e) as ev_total
+}
+CALL {
+    MATCH (e:Event)
+    WHERE e.timestamp >= datetime($today_start_utc) AND e.timestamp < datetime($tomorrow_start_utc)
+    RETURN count(e) as ev_today
+}
+CALL {
+    MATCH (e:Event)
+    WHERE e.timestamp >= datetime($yesterday_start_utc) AND e.timestamp < datetime($today_start_utc)
+    RETURN count(e) as ev_yesterday
+}
+CALL {
+    MATCH (a:Anomaly)
+    RETURN count(a) as anom_total
+}
+CALL {
+    MATCH (a:Anomaly)
+    WHERE a.status IN ['new', 'investigating']
+    RETURN count(a) as anom_active
+}
+CALL {
+    MATCH (p:TrackedPerson)
+    RETURN count(p) as tp_total
+}
+CALL {
+    MATCH (p:TrackedPerson)
+    WHERE p.first_seen >= $today_start
+    RETURN count(p) as tp_new_today
+}
+RETURN cam_total, cam_active, cam_yesterday,
+       ev_total, ev_today, ev_yesterday,
+       anom_total, anom_active,
+       tp_total, tp_new_today
+"""
+
+# Sorts the whole event history, so it runs alongside the counts query
+RECENT_ACTIVITY_QUERY = """
+MATCH (c:Camera)-[:CAPTURED]->(e:Event)
+RETURN e.id as id,
+       e.event_type as event_type,
+       e.description as description,
+       e.caption as caption,
+       e.timestamp as timestamp,
+       c.name as camera_name,
+       c.location as camera_location
+ORDER BY e.timestamp DESC
+LIMIT $limit
+"""
+
 
 class DashboardService:
     def __init__(self):
         self.db = neo4j_client
         self.cache = redis_client
 
-    async def get_dashboard_stats(self) -> Dict[str, Any]:
-        """Get all dashboard statistics"""
+    async def get_dashboard_stats(self, recent_limit: int = 5) -> Dict[str, Any]:
+        """Get all dashboard statistics (Redis cache, then Neo4j)"""
         try:
-            # Get all stats in parallel
-            cameras_stats = await self._get_camera_stats()
-            events_stats = await self._get_events_stats()
-            recent_activity = await self._get_recent_activity()
-            anomalies_stats = await self._get_anomalies_stats()
-            tracked_persons_stats = await self._get_tracked_persons_stats()
+            now = datetime.now()
+            recent_key = f"{DASHBOARD_RECENT_CACHE_KEY}:{recent_limit}"
+            
+            try:
+                cached_stats, cached_recent = await self.cache.client.mget(
+                    DASHBOARD_STATS_CACHE_KEY, recent_key
+                )
+            except Exception as e:
+                logger.debug(f"Dashboard cache lookup failed: {e}")
+                cached_stats = cached_recent = None
+            
+            stats = orjson.loads(cached_stats) if cached_stats else None
+            recent_activity = orjson.loads(cached_recent) if cached_recent else None
+            
+            if stats is None and recent_activity is None:
+                stats, recent_activity = await asyncio.gather(
+                    self._query_stats(now),
+                    self._query_recent_activity(recent_limit)
+                )
+            elif stats is None:
+                stats = await self._query_stats(now)
+            elif recent_activity is None:
+                recent_activity = await self._query_recent_activity(recent_limit)
 
             return {
-                "cameras": cameras_stats,
-                "events": events_stats,
+                **stats,
                 "recent_activity": recent_activity,
-                "anomalies": anomalies_stats,
-                "tracked_persons": tracked_persons_stats,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now.isoformat()
             }
         except Exception as e:
             logger.error(f"Error getting dashboard stats: {e}")
             raise
 
-    async def _get_camera_stats(self) -> Dict[str, Any]:
-        """Get camera statistics"""
+    async def _query_stats(self, now: datetime) -> Dict[str, Any]:
+        """Run the counts query, build the stat panels and cache them"""
+        # Event days are UTC, matching date() on the Neo4j side
+        today_start_utc = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        params = {
+            "yesterday": now - timedelta(days=1),
+            "today_start": now.replace(hour=0, minute=0, second=0, microsecond=0),
+            "yesterday_start_utc": (today_start_utc - timedelta(days=1)).isoformat(),
+            "today_start_utc": today_start_utc.isoformat(),
+            "tomorrow_start_utc": (today_start_utc + timedelta(days=1)).isoformat()
+        }
+        
         try:
-            query = """
-            MATCH (c:Camera)
-            WITH count(c) as total,
-                 sum(CASE WHEN c.is_active = true THEN 1 ELSE 0 END) as active
-            RETURN total, active
-            """
-            
-            # FIX: Use async_execute_query instead of execute_query
-            result = await self.db.async_execute_query(query)
-            
-            if result:
-                record = result[0]
-                total = record.get('total', 0)
-                active = record.get('active', 0)
-                
-                # Get yesterday's count for comparison
-                yesterday = datetime.now() - timedelta(days=1)
-                yesterday_query = """
-                MATCH (c:Camera)
-                WHERE c.created_at < $yesterday
-                RETURN count(c) as yesterday_total
-                """
-                yesterday_result = await self.db.async_execute_query(
-                    yesterday_query,
-                    {"yesterday": yesterday}
-                )
-                
-                yesterday_total = yesterday_result[0].get('yesterday_total', total) if yesterday_result else total
-                change = total - yesterday_total
-                
-                return {
-                    "total": total,
-                    "active": active,
-                    "inactive": total - active,
-                    "change_from_yesterday": change
-                }
-            
-            return {
-                "total": 0,
-                "active": 0,
-                "inactive": 0,
-                "change_from_yesterday": 0
-            }
+            result = await self.db.async_execute_query(DASHBOARD_STATS_QUERY, params)
         except Exception as e:
-            logger.error(f"Error getting camera stats: {e}")
-            return {
-                "total": 0,
-                "active": 0,
-                "inactive": 0,
-                "change_from_yesterday": 0
-            }
-
-    async def _get_events_stats(self) -> Dict[str, Any]:
-        """Get events statistics"""
+            # Keep the dashboard rendering with zeroed panels, but don't cache them
+            logger.error(f"Error querying dashboard stats: {e}", exc_info=True)
+            return self._build_stats({})
+        
+        stats = self._build_stats(result[0] if result else {})
+        
         try:
-            # Use Neo4j's date() function to get today's date boundary
-            query = """
-            WITH date() as today, date() - duration('P1D') as yesterday
-            MATCH (e:Event)
-            WITH today, yesterday, e,
-                 date(datetime(e.timestamp)) as event_date
-            RETURN count(e) as total,
-                   sum(CASE WHEN event_date = today THEN 1 ELSE 0 END) as today,
-                   sum(CASE WHEN event_date = yesterday THEN 1 ELSE 0 END) as yesterday
-            """
-            
-            result = await self.db.async_execute_query(query)
-            
-            if result:
-                record = result[0]
-                return {
-                    "total": record.get('total', 0),
-                    "today": record.get('today', 0),
-                    "yesterday": record.get('yesterday', 0)
-                }
-            
-            return {
-                "total": 0,
-                "today": 0,
-                "yesterday": 0
-            }
+            await self.cache.client.setex(
+                DASHBOARD_STATS_CACHE_KEY, DASHBOARD_STATS_CACHE_TTL, orjson.dumps(stats)
+            )
         except Exception as e:
-            logger.error(f"Error getting events stats: {e}", exc_info=True)
-            return {
-                "total": 0,
-                "today": 0,
-                "yesterday": 0
-            }
+            logger.debug(f"Dashboard cache write failed: {e}")
+        
+        return stats
 
-    async def _get_recent_activity(self, limit: int = 5) -> List[Dict[str, Any]]:
-        """Get recent activity events"""
+    async def _query_recent_activity(self, limit: int) -> List[Dict[str, Any]]:
+        """Run the recent activity query, format the rows and cache them"""
         try:
-            query = """
-            MATCH (c:Camera)-[:CAPTURED]->(e:Event)
-            RETURN e.id as id,
-                   e.event_type as event_type,
-                   e.description as description,
-                   e.caption as caption,
-                   e.timestamp as timestamp,
-                   c.name as camera_name,
-                   c.location as camera_location
-            ORDER BY e.timestamp DESC
-            LIMIT $limit
-            """
-            
-            # FIX: Use async_execute_query
-            result = await self.db.async_execute_query(query, {"limit": limit})
-            
-            activities = []
-            for record in result:
-                # Convert Neo4j DateTime to Python datetime
-                timestamp = record.get('timestamp')
-                if isinstance(timestamp, Neo4jDateTime):
-                    timestamp = timestamp.to_native()
-                elif isinstance(timestamp, str):
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    except:
-                        timestamp = datetime.now()
-                elif not isinstance(timestamp, datetime):
-                    timestamp = datetime.now()
-                
-                # Determine status based on event type
-                event_type = record.get('event_type', 'detection')
-                
-                # Use description if available, otherwise use caption
-                description = record.get('description') or record.get('caption', 'Activity detected')
-                
-                # Ensure proper status mapping
-                status = 'warning' if event_type in ['anomaly', 'alert', 'intrusion'] else 'normal'
-                
-                activity = {
-                    "id": record.get('id'),
-                    "event": description,
-                    "event_type": event_type,
-                    "camera": record.get('camera_name', 'Unknown Camera'),
-                    "camera_location": record.get('camera_location'),
-                    "timestamp": timestamp.isoformat(),
-                    "status": status
-                }
-                activities.append(activity)
-            
-            return activities
+            result = await self.db.async_execute_query(RECENT_ACTIVITY_QUERY, {"limit": limit})
         except Exception as e:
-            logger.error(f"Error getting recent activity: {e}")
+            logger.error(f"Error getting recent activity: {e}", exc_info=True)
             return []
-
-    async def _get_anomalies_stats(self) -> Dict[str, Any]:
-        """Get anomalies statistics"""
+        
+        activities = self._recent_activity(result)
+        
         try:
-            query = """
-            MATCH (a:Anomaly)
-            WITH count(a) as total_count,
-                 sum(CASE WHEN a.status = 'new' OR a.status = 'investigating' THEN 1 ELSE 0 END) as active_count
-            RETURN total_count, active_count
-            """
-            
-            # FIX: Use async_execute_query
-            result = await self.db.async_execute_query(query)
-            
-            if result:
-                record = result[0]
-                total = record.get('total_count', 0)
-                active = record.get('active_count', 0)
-                return {
-                    "count": active,
-                    "total": total,
-                    "resolved": total - active
-                }
-            
-            return {
-                "count": 0,
-                "total": 0,
-                "resolved": 0
-            }
+            await self.cache.client.setex(
+                f"{DASHBOARD_RECENT_CACHE_KEY}:{limit}",
+                DASHBOARD_RECENT_CACHE_TTL,
+                orjson.dumps(activities)
+            )
         except Exception as e:
-            logger.error(f"Error getting anomalies stats: {e}")
-            return {
-                "count": 0,
-                "total": 0,
-                "resolved": 0
-            }
+            logger.debug(f"Dashboard cache write failed: {e}")
+        
+        return activities
 
-    async def _get_tracked_persons_stats(self) -> Dict[str, Any]:
-        """Get tracked persons statistics"""
-        try:
-            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    def _build_stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Build every stat panel from the counts record"""
+        return {
+            "cameras": self._camera_stats(record),
+            "events": self._events_stats(record),
+            "anomalies": self._anomalies_stats(record),
+            "tracked_persons": self._tracked_persons_stats(record)
+        }
+
+    def _camera_stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Build camera statistics from the dashboard record"""
+        total = record.get('cam_total') or 0
+        active = record.get('cam_active') or 0
+        yesterday_total = record.get('cam_yesterday', total)
+        
+        return {
+            "total": total,
+            "active": active,
+            "inactive": total - active,
+            "change_from_yesterday": total - yesterday_total
+        }
+
+    def _events_stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Build events statistics from the dashboard record"""
+        return {
+            "total": record.get('ev_total') or 0,
+            "today": record.get('ev_today') or 0,
+            "yesterday": record.get('ev_yesterday') or 0
+        }
+
+    def _recent_activity(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build recent activity entries from the recent activity rows"""
+        activities = []
+        for event in events:
+            # Convert Neo4j DateTime to Python datetime
+            timestamp = event.get('timestamp')
+            if isinstance(timestamp, Neo4jDateTime):
+                timestamp = timestamp.to_native()
+            elif isinstance(timestamp, str):
+                try:
+                    timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                except:
+                    timestamp = datetime.now()
+            elif not isinstance(timestamp, datetime):
+                timestamp = datetime.now()
             
-            query = """
-            MATCH (p:TrackedPerson)
-            WITH count(p) as total,
-                 sum(CASE WHEN p.first_seen >= $today_start THEN 1 ELSE 0 END) as new_today
-            RETURN total, new_today
-            """
+            # Determine status based on event type
+            event_type = event.get('event_type') or 'detection'
             
-            # FIX: Use async_execute_query
-            result = await self.db.async_execute_query(query, {"today_start": today_start})
+            # Use description if available, otherwise use caption
+            description = event.get('description') or event.get('caption') or 'Activity detected'
             
-            if result:
-                record = result[0]
-                return {
-                    "count": record.get('total', 0),
-                    "new_today": record.get('new_today', 0)
-                }
+            # Ensure proper status mapping
+            status = 'warning' if event_type in ['anomaly', 'alert', 'intrusion'] else 'normal'
             
-            return {
-                "count": 0,
-                "new_today": 0
-            }
-        except Exception as e:
-            logger.error(f"Error getting tracked persons stats: {e}")
-            return {
-                "count": 0,
-                "new_today": 0
-            }
+            activities.append({
+                "id": event.get('id'),
+                "event": description,
+                "event_type": event_type,
+                "camera": event.get('camera_name') or 'Unknown Camera',
+                "camera_location": event.get('camera_location'),
+                "timestamp": timestamp.isoformat(),
+                "status": status
+            })
+        
+        return activities
+
+    def _anomalies_stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Build anomalies statistics from the dashboard record"""
+        total = record.get('anom_total') or 0
+        active = record.get('anom_active') or 0
+        
+        return {
+            "count": active,
+            "total": total,
+            "resolved": total - active
+        }
+
+    def _tracked_persons_stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Build tracked persons statistics from the dashboard record"""
+        return {
+            "count": record.get('tp_total') or 0,
+            "new_today": record.get('tp_new_today') or 0
+        }
 
 
 # Create singleton instance
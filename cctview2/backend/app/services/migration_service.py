@@ -347,6 +347,7 @@ class MigrationService:
             result = await neo4j_client.async_execute_query(query, params)
             
             if result:
+                await redis_client.bump_event_data_version()
                 logger.info(f"✅ Created Neo4j event: {event_id}")
                 logger.info(f"   Caption: \"{event_data['caption'][:50]}...\"")
                 logger.info(f"   Duration: {duration:.1f}s ({event_data['count']} frames)")
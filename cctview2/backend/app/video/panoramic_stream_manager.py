@@ -82,9 +82,7 @@ class PanoramicStreamManager:
                 # Stitch frames using AI service (model_manager)
                 from app.services.ai_service_client import ai_service
                 
-                result = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    self._stitch_frames_sync,
+                result = await ai_service.stitch_panoramic_frames_remote(
                     frames,
                     pano_config["stitch_mode"]
                 )
@@ -103,11 +101,6 @@ class PanoramicStreamManager:
         except Exception as e:
             logger.error(f"❌ Panoramic loop error: {e}")
     
-    def _stitch_frames_sync(self, frames: List, mode: str):
-        """Synchronous stitching (runs in executor)"""
-        from app.services.ai_service_client import ai_service
-        return ai_service.stitch_panoramic_frames(frames, mode)
-    
     async def stop_panorama(self, panorama_id: str):
         """Stop panoramic stitching"""
         if panorama_id in self.active_panoramas:
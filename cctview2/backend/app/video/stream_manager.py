@@ -11,7 +11,6 @@ import numpy as np
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
-from PIL import Image
 from app.api.v1.websockets.caption_manager import caption_manager
 
 from app.core.config import settings
@@ -328,24 +327,14 @@ class StreamManager:
             # Continue with existing code...
             logger.info(f"🎬 Processing batch of {len(frames_with_timestamps)} frames")
             
-            # Convert frames to PIL Images for AI service
-            pil_images = []
-            for frame, _ in frames_with_timestamps:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-                
-                # Resize if too large
-                max_size = 1920
-                if pil_image.width > max_size or pil_image.height > max_size:
-                    pil_image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                
-                pil_images.append(pil_image)
+            # OpenCV frames go to the AI service as-is (the client resizes and encodes BGR directly)
+            batch_frames = [frame for frame, _ in frames_with_timestamps]
             
             # Send batch to AI service for comprehensive caption
-            logger.info(f"📤 Sending {len(pil_images)} frames to AI service (192.168.0.9:8888)")
+            logger.info(f"📤 Sending {len(batch_frames)} frames to AI service (192.168.0.9:8888)")
             
             caption_result = await ai_service.generate_batch_caption(
-                images=pil_images
+                images=batch_frames
                 # Prompt is now built into the client, no need to pass it here
             )
             
@@ -359,7 +348,7 @@ class StreamManager:
             logger.info(f"✅ Comprehensive caption generated:")
             logger.info(f"   '{caption[:150]}...'")
             logger.info(f"   Confidence: {confidence:.2%}")
-            logger.info(f"   Frames analyzed: {len(pil_images)}")
+            logger.info(f"   Frames analyzed: {len(batch_frames)}")
             
             # Generate embedding
             embedding_result = await ai_service.generate_embedding(caption)
@@ -379,7 +368,7 @@ class StreamManager:
                 metadata={
                     "processing_time": caption_result.get("processing_time", 0),
                     "ai_model": "VILA_BATCH",
-                    "frames_analyzed": len(pil_images),
+                    "frames_analyzed": len(batch_frames),
                     "interval": interval,
                     "time_range": {
                         "start": first_timestamp.isoformat(),
@@ -400,7 +389,7 @@ class StreamManager:
                     "confidence": confidence,
                     "stored": True,
                     "interval": interval,
-                    "frames_analyzed": len(pil_images),
+                    "frames_analyzed": len(batch_frames),
                     "time_range": {
                         "start": first_timestamp.isoformat(),
                         "end": last_timestamp.isoformat()
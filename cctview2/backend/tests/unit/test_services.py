@@ -0,0 +1,171 @@
+"""
+Unit tests for backend services
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import anomaly_detection_service as anomaly_module
+
+
+CAPTION = "A person is standing near the entrance"
+
+RULE = {
+    "id": "rule_1",
+    "name": "Loitering",
+    "description": "Person loitering near entrance",
+    "always_check": True,
+    "conditions": {},
+}
+
+
+class FakeClock:
+    """Monotonic clock the tests move forward by hand"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the caption dedup, with expiry on a fake clock"""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.store = {}
+
+    def _get(self, key):
+        if key not in self.store:
+            return None
+        value, expires_at = self.store[key]
+        if expires_at is not None and expires_at <= self.clock.now:
+            del self.store[key]
+            return None
+        return value
+
+    async def get(self, key):
+        return self._get(key)
+
+    async def mget(self, *keys):
+        return [self._get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode()
+        self.store[key] = (value, self.clock.now + ex if ex else None)
+        return True
+
+    async def incr(self, key):
+        value = int(self._get(key) or 0) + 1
+        self.store[key] = (str(value).encode(), None)
+        return value
+
+    async def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*") if match else ""
+        for key in list(self.store):
+            if key.startswith(prefix):
+                yield key
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def anomaly_service(monkeypatch, clock):
+    """Service with fake Redis, a single rule and a rule check that never matches"""
+    service = anomaly_module.AnomalyDetectionService()
+    monkeypatch.setattr(
+        anomaly_module, "redis_client", type("FakeRedisClient", (), {"client": FakeRedis(clock)})()
+    )
+    service.rules = [RULE]
+    service.settled = True
+    service.rule_checks = []
+
+    async def get_rules(camera_id):
+        return list(service.rules)
+
+    async def first_matching_rule(rules, caption):
+        service.rule_checks.append(caption)
+        return None, service.settled
+
+    monkeypatch.setattr(service, "_get_anomaly_rules_for_camera", get_rules)
+    monkeypatch.setattr(service, "_first_matching_rule", first_matching_rule)
+    return service
+
+
+def check_twice(service, clock, caption_interval, between=None, **kwargs):
+    """Check CAPTION, wait caption_interval seconds and check it again"""
+
+    async def run():
+        await service.check_caption_for_anomalies("cam_1", CAPTION, "2026-01-01T00:00:00", **kwargs)
+        clock.advance(caption_interval)
+        if between is not None:
+            await between()
+        await service.check_caption_for_anomalies("cam_1", CAPTION, "2026-01-01T00:01:00", **kwargs)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("caption_interval", [15, 60])
+def test_repeated_caption_skips_rule_checks(anomaly_service, clock, caption_interval):
+    """An identical caption one caption_interval after a successful check is not checked again"""
+    check_twice(anomaly_service, clock, caption_interval)
+
+    assert anomaly_service.rule_checks == [CAPTION]
+
+
+def test_changed_caption_is_checked_again(anomaly_service, clock):
+    """A different caption is always checked against the rules"""
+
+    async def run():
+        await anomaly_service.check_caption_for_anomalies("cam_1", "An empty hallway", "2026-01-01T00:00:00")
+        clock.advance(15)
+        await anomaly_service.check_caption_for_anomalies("cam_1", "A person running", "2026-01-01T00:00:15")
+
+    asyncio.run(run())
+
+    assert anomaly_service.rule_checks == ["An empty hallway", "A person running"]
+
+
+def test_failed_check_does_not_suppress_repeat(anomaly_service, clock):
+    """A check without reliable verdicts (e.g. Ollama errors) leaves the caption unrecorded"""
+    anomaly_service.settled = False
+
+    check_twice(anomaly_service, clock, 15)
+
+    assert anomaly_service.rule_checks == [CAPTION, CAPTION]
+
+
+def test_empty_rules_do_not_suppress_repeat(anomaly_service, clock):
+    """With no rules (or a failed rules fetch) the caption is not recorded"""
+    anomaly_service.rules = []
+
+    async def add_rule():
+        anomaly_service.rules = [RULE]
+
+    check_twice(anomaly_service, clock, 15, between=add_rule)
+
+    assert anomaly_service.rule_checks == [CAPTION]
+    assert "lastcap:cam_1" in anomaly_module.redis_client.client.store
+
+
+def test_rule_change_forces_recheck(anomaly_service, clock):
+    """Invalidating the rules cache makes an unchanged caption count as new"""
+    check_twice(anomaly_service, clock, 15, between=anomaly_service.invalidate_rules_cache)
+
+    assert anomaly_service.rule_checks == [CAPTION, CAPTION]
+
+
+def test_manual_check_skips_dedup(anomaly_service, clock):
+    """dedup=False always runs the rule checks"""
+    check_twice(anomaly_service, clock, 15, dedup=False)
+
+    assert anomaly_service.rule_checks == [CAPTION, CAPTION]
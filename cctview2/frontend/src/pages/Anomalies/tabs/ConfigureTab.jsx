@@ -48,6 +48,7 @@ function ConfigureTab({ toast, onRuleChange }) {
     severity: 'medium',
     enabled: true,
     priority: 5,
+    always_check: true,
     camera_ids: [],
     conditions: {
       object_class: 'person',
@@ -110,6 +111,7 @@ function ConfigureTab({ toast, onRuleChange }) {
       severity: 'medium',
       enabled: true,
       priority: 5,
+      always_check: true,
       camera_ids: [],
       conditions: {
         object_class: 'person',
@@ -130,6 +132,7 @@ function ConfigureTab({ toast, onRuleChange }) {
       severity: rule.severity || 'medium',
       enabled: rule.enabled !== undefined ? rule.enabled : true,
       priority: rule.priority || 5,
+      always_check: rule.always_check !== undefined ? rule.always_check : true,
       camera_ids: rule.camera_ids || [],
       conditions: rule.conditions || {
         object_class: 'person',
@@ -648,6 +651,28 @@ function ConfigureTab({ toast, onRuleChange }) {
             </button>
           </div>
 
+          {/* Always Check Toggle */}
+          <div className="flex items-center justify-between">
+            <label className={`text-sm font-medium ${
+              theme === 'dark' ? 'text-slate-300' : 'text-slate-700'
+            }`}>
+              Check every caption (even without matching keywords)
+            </label>
+            <button
+              type="button"
+              onClick={() => setFormData({ ...formData, always_check: !formData.always_check })}
+              className={`relative inline-flex h-6 w-11 items-center rounded-full transition-colors ${
+                formData.always_check ? 'bg-blue-500' : 'bg-slate-300'
+              }`}
+            >
+              <span
+                className={`inline-block h-4 w-4 transform rounded-full bg-white transition-transform ${
+                  formData.always_check ? 'translate-x-6' : 'translate-x-1'
+                }`}
+              />
+            </button>
+          </div>
+
           {/* Actions */}
           <div className="flex gap-3 pt-4">
             <Button
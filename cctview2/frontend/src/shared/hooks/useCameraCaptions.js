@@ -52,32 +52,7 @@ const useCameraCaptions = (cameraId) => {
               return newCaptions.slice(0, 10);
             });
             
-            // Trigger anomaly check for this caption
-            if (data.caption && data.camera_id) {
-              try {
-                const response = await fetch('http://10.215.101.38:8000/api/v1/anomaly-detection/check-caption', {
-                  method: 'POST',
-                  headers: {
-                    'Content-Type': 'application/json',
-                  },
-                  body: JSON.stringify({
-                    camera_id: data.camera_id,
-                    caption: data.caption,
-                    timestamp: data.timestamp,
-                    confidence: data.confidence || 0.0
-                  })
-                });
-                
-                if (response.ok) {
-                  const result = await response.json();
-                  if (result.anomaly_detected) {
-                    console.log('⚠️ Anomaly detected:', result.anomaly);
-                  }
-                }
-              } catch (error) {
-                console.error('Error checking for anomalies:', error);
-              }
-            }
+            // Anomaly checks run server-side as captions are stored
           }
         } catch (err) {
           console.error('Error parsing WebSocket message:', err);